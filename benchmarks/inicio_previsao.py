@@ -0,0 +1,64 @@
+"""Custo de cada biblioteca de previsão no início a frio.
+
+Para cada modelo da página de análise preditiva, um interpretador novo mede:
+o import dos módulos da página (utils.previsao, sem bibliotecas pesadas), o
+import da biblioteca do modelo e a primeira previsão (ajuste sem registro).
+
+Uso: python benchmarks/inicio_previsao.py [cultura] [rebanho]
+"""
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado em um processo novo para cada modelo
+MEDICAO = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {raiz!r})
+inicio = time.perf_counter()
+from utils import dependencias
+from utils.previsao import ajustar_serie, series_da_previsao
+import_pagina = time.perf_counter() - inicio
+
+modelo = {modelo!r}
+resultado = {{'import_pagina_s': import_pagina, 'faltantes': dependencias.faltantes(modelo)}}
+if not resultado['faltantes']:
+    anos, partes = series_da_previsao(modelo, {cultura!r}, {rebanho!r}, 1, 1)
+    _, y, _ = partes[0]
+    inicio = time.perf_counter()
+    try:
+        ajustar_serie(modelo, anos, y)
+    except ImportError as e:
+        resultado['erro'] = str(e)
+    resultado['primeira_previsao_s'] = time.perf_counter() - inicio
+    resultado['import_bibliotecas_s'] = dependencias.tempos()['import']
+print(json.dumps(resultado))
+"""
+
+
+def medir(modelo, cultura, rebanho):
+    codigo = MEDICAO.format(raiz=RAIZ, modelo=modelo, cultura=cultura, rebanho=rebanho)
+    saida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main(cultura='Algodão', rebanho='Bovino'):
+    sys.path.insert(0, RAIZ)
+    from utils.dependencias import BIBLIOTECAS_MODELO
+
+    print(f"{'modelo':<22} {'import página':>14} {'import libs':>12} {'1ª previsão':>12}")
+    for modelo in BIBLIOTECAS_MODELO:
+        r = medir(modelo, cultura, rebanho)
+        if r['faltantes']:
+            print(f"{modelo:<22} {r['import_pagina_s'] * 1000:11.0f} ms   indisponível ({', '.join(r['faltantes'])})")
+            continue
+        libs = sum(r['import_bibliotecas_s'].values())
+        print(f"{modelo:<22} {r['import_pagina_s'] * 1000:11.0f} ms {libs * 1000:9.0f} ms "
+              f"{r['primeira_previsao_s'] * 1000:9.0f} ms" + (f"  erro: {r['erro']}" if 'erro' in r else ''))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:3])
@@ -0,0 +1,84 @@
+"""Micro-benchmark da leitura dos arquivos de estação do INMET.
+
+Compara, sobre todos os arquivos de data/dados_meteorologicos, o caminho
+antigo (leitura como texto, troca de 'null' e conversão coluna a coluna;
+e as três tentativas de read_csv do painel consolidado) com o leitor de
+passada única `ler_arquivo_inmet`.
+
+Uso: python benchmarks/leitura_inmet.py [repeticoes]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_processing import COLUNAS_METEO_CURTAS, ler_arquivo_inmet, listar_arquivos_meteo
+from utils.meteo import ler_cabecalho_estacao
+
+
+def leitura_antiga(caminho):
+    """Caminho anterior de pages/meteorogg.py (process_meteo_data)"""
+    df = pd.read_csv(caminho, skiprows=10, sep=';')
+    df = df.rename(columns=COLUNAS_METEO_CURTAS)
+    df['Data'] = pd.to_datetime(df['Data'])
+    df['Mes'] = df['Data'].dt.month
+    df = df.replace('null', pd.NA)
+    for col in df.columns.drop(['Data', 'Mes']):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def leitura_antiga_consolidado(caminho):
+    """Caminho anterior de app_completo.carregar_meteorologicos"""
+    try:
+        return pd.read_csv(caminho, skiprows=10, sep=';')
+    except Exception:
+        try:
+            return pd.read_csv(caminho, sep=';')
+        except Exception:
+            return pd.read_csv(caminho, sep=None, engine='python')
+
+
+def cronometrar(funcao, argumentos, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for args in argumentos:
+            funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main(repeticoes=5):
+    arquivos = listar_arquivos_meteo()
+    if not arquivos:
+        raise SystemExit("Nenhum arquivo do INMET encontrado em data/dados_meteorologicos")
+    offsets = [ler_cabecalho_estacao(arq)['offset_dados'] for arq in arquivos]
+
+    casos = [
+        ('antigo (texto + to_numeric)', leitura_antiga, [(a,) for a in arquivos]),
+        ('antigo (consolidado, só texto)', leitura_antiga_consolidado, [(a,) for a in arquivos]),
+        ('ler_arquivo_inmet', ler_arquivo_inmet, [(a,) for a in arquivos]),
+        ('ler_arquivo_inmet + offset', ler_arquivo_inmet, list(zip(arquivos, offsets))),
+    ]
+    print(f"{len(arquivos)} arquivos, melhor de {repeticoes} repetições")
+    referencia = None
+    for nome, funcao, argumentos in casos:
+        tempo = cronometrar(funcao, argumentos, repeticoes)
+        referencia = referencia or tempo
+        print(f"{nome:<32} {tempo * 1000:8.1f} ms  ({referencia / tempo:4.1f}x)")
+
+    # Valores perdidos pelo caminho antigo (vírgula decimal não convertida)
+    antigo = pd.concat([leitura_antiga(a) for a in arquivos], ignore_index=True)
+    novo = pd.concat([ler_arquivo_inmet(a) for a in arquivos], ignore_index=True)
+    novo = novo.rename(columns=COLUNAS_METEO_CURTAS)
+    medidas = list(COLUNAS_METEO_CURTAS.values())[1:]
+    perdidos = int((antigo[medidas].isna() & novo[medidas].notna()).sum().sum())
+    print(f"valores numéricos perdidos pelo caminho antigo: {perdidos}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
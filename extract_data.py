@@ -1,7 +1,10 @@
+import json
 import os
-import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from meteostat import Point, Daily
+
+import pandas as pd
 
 # Lista de principais cidades do MS
 MS_CITIES = [
@@ -9,9 +12,17 @@ MS_CITIES = [
     'Ponta Porã', 'Naviraí', 'Nova Andradina', 'Aquidauana'
 ]
 
+# Pasta de saída e do checkpoint das coletas já feitas
+PASTA_DADOS = os.path.join('data', 'dados_meteorologicos')
+PASTA_CHECKPOINT = os.path.join(PASTA_DADOS, '.checkpoint')
+
+# Número máximo de cidades consultadas em paralelo
+MAX_WORKERS = int(os.environ.get('EXTRACT_MAX_WORKERS', '4'))
+
 def create_data_directories():
     """Cria os diretórios necessários para armazenar os dados se não existirem"""
-    os.makedirs('data/dados_meteorologicos', exist_ok=True)
+    os.makedirs(PASTA_DADOS, exist_ok=True)
+    os.makedirs(PASTA_CHECKPOINT, exist_ok=True)
 
 # Coordenadas das cidades (latitude, longitude)
 CITY_COORDS = {
@@ -25,108 +36,174 @@ CITY_COORDS = {
     'Aquidauana': (-20.4666, -55.7868)
 }
 
-def get_weather_data(city, date):
-    """Obtém dados meteorológicos históricos para uma cidade específica usando Meteostat"""
+COLUNAS_SAIDA = {
+    'tavg': 'Temperatura_C',   # temperatura média
+    'pres': 'Pressao_hPa',     # pressão atmosférica
+    'rhum': 'Umidade_Perc',    # umidade relativa
+    'prcp': 'Precipitacao_mm'  # precipitação
+}
+
+def fonte_meteostat(lat, lon, start, end):
+    """Busca os dados diários de um intervalo inteiro em uma única consulta ao Meteostat"""
+    from meteostat import Point, Daily
+
+    return Daily(Point(lat, lon), start, end).fetch()
+
+def get_weather_data(city, start, end, fonte=fonte_meteostat):
+    """Obtém dados meteorológicos diários de uma cidade entre `start` e `end` (inclusive).
+
+    `fonte(lat, lon, start, end)` deve retornar um DataFrame indexado pela data
+    com as colunas tavg, pres, rhum e prcp (formato do Meteostat); pode ser
+    trocada por um stub local em testes. Retorna None se a consulta falhar ou
+    não trouxer nenhum dia.
+    """
     try:
         lat, lon = CITY_COORDS[city]
-        location = Point(lat, lon)
-        
-        # Definir período de busca (um dia)
-        start = date
-        end = date
-        
-        # Buscar dados diários
-        data = Daily(location, start, end)
-        data = data.fetch()
-        
-        if data.empty:
-            print(f"Dados meteorológicos não disponíveis para {city} em {date.strftime('%Y-%m-%d')}")
-            return None
-        
-        # Obter primeira (e única) linha dos dados
-        daily_data = data.iloc[0]
-        
-        return {
-            'temperatura': daily_data.get('tavg', 0),  # temperatura média
-            'pressao': daily_data.get('pres', 0),      # pressão atmosférica
-            'umidade': daily_data.get('rhum', 0),      # umidade relativa
-            'precipitacao': daily_data.get('prcp', 0)  # precipitação
-        }
+        data = fonte(lat, lon, start, end)
     except Exception as e:
         print(f"Erro ao obter dados para {city}: {e}")
         return None
 
-def extract_and_save_data():
+    if data is None or data.empty:
+        print(f"Dados meteorológicos não disponíveis para {city} entre "
+              f"{start.strftime('%Y-%m-%d')} e {end.strftime('%Y-%m-%d')}")
+        return None
+
+    df = data.reindex(columns=list(COLUNAS_SAIDA)).rename(columns=COLUNAS_SAIDA)
+    df.index = pd.to_datetime(df.index)
+    return df.rename_axis('Data').reset_index()
+
+# ---------------------------------------------------------------------------
+# Checkpoint: dados já coletados por cidade e intervalos já consultados
+# ---------------------------------------------------------------------------
+
+_lock_checkpoint = threading.Lock()
+
+def _arquivo_checkpoint(city):
+    nome = city.lower().replace(' ', '_')
+    return os.path.join(PASTA_CHECKPOINT, f'{nome}.csv')
+
+def _arquivo_intervalos():
+    return os.path.join(PASTA_CHECKPOINT, 'intervalos.json')
+
+def _ler_intervalos():
+    if not os.path.exists(_arquivo_intervalos()):
+        return {}
+    with open(_arquivo_intervalos(), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _registrar_intervalo(city, start, end):
+    with _lock_checkpoint:
+        intervalos = _ler_intervalos()
+        intervalos.setdefault(city, []).append([start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')])
+        temporario = _arquivo_intervalos() + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(intervalos, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, _arquivo_intervalos())
+
+def ler_checkpoint(city):
+    """Dados diários já coletados para a cidade"""
+    arquivo = _arquivo_checkpoint(city)
+    if not os.path.exists(arquivo):
+        return pd.DataFrame(columns=['Data'] + list(COLUNAS_SAIDA.values()))
+    return pd.read_csv(arquivo, parse_dates=['Data'])
+
+def intervalos_faltantes(city, start, end):
+    """Intervalos de datas entre `start` e `end` ainda não consultados para a cidade"""
+    cobertos = sorted(
+        (datetime.strptime(i, '%Y-%m-%d'), datetime.strptime(f, '%Y-%m-%d'))
+        for i, f in _ler_intervalos().get(city, [])
+    )
+    faltantes = []
+    atual = start
+    for inicio, fim in cobertos:
+        if fim < atual:
+            continue
+        if inicio > end:
+            break
+        if inicio > atual:
+            faltantes.append((atual, inicio - timedelta(days=1)))
+        atual = max(atual, fim + timedelta(days=1))
+    if atual <= end:
+        faltantes.append((atual, end))
+    return faltantes
+
+def atualizar_cidade(city, start, end, fonte=fonte_meteostat):
+    """Busca apenas os intervalos faltantes da cidade e grava o checkpoint"""
+    novos = []
+    for inicio, fim in intervalos_faltantes(city, start, end):
+        df = get_weather_data(city, inicio, fim, fonte)
+        if df is None:
+            # Falha ou resposta vazia: o intervalo não é marcado como coletado
+            continue
+        novos.append(df)
+        # Só as datas que de fato vieram; o restante volta a ser consultado
+        _registrar_intervalo(city, df['Data'].min(), df['Data'].max())
+
+    df_cidade = ler_checkpoint(city)
+    if novos:
+        df_cidade = pd.concat([df_cidade] + novos, ignore_index=True)
+        df_cidade['Data'] = pd.to_datetime(df_cidade['Data'])
+        df_cidade = df_cidade.drop_duplicates(subset='Data', keep='last').sort_values('Data')
+        df_cidade.to_csv(_arquivo_checkpoint(city), index=False)
+        print(f"{city}: {sum(len(d) for d in novos)} novos registros")
+    else:
+        print(f"{city}: nada a buscar, usando checkpoint")
+
+    df_cidade = df_cidade[(df_cidade['Data'] >= start) & (df_cidade['Data'] <= end)]
+    return df_cidade.assign(Cidade=city)
+
+def extract_and_save_data(years=range(2020, 2025), fonte=fonte_meteostat, max_workers=MAX_WORKERS):
     """Extrai dados meteorológicos históricos de 2020 a 2024 e salva em arquivos CSV separados por ano"""
-    # Definir período de 2020 a 2024
-    years = range(2020, 2025)
-    
+    start = datetime(min(years), 1, 1)
+    end = datetime(max(years), 12, 31)
+
+    print(f"\nColetando dados de {start.year} a {end.year} para {len(MS_CITIES)} cidades...")
+
+    # Uma consulta por intervalo faltante de cada cidade, com as cidades em paralelo
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resultados = list(executor.map(lambda city: atualizar_cidade(city, start, end, fonte), MS_CITIES))
+
+    df_todas = pd.concat(resultados, ignore_index=True)
+    if df_todas.empty:
+        print('Não foi possível obter dados meteorológicos')
+        return
+
+    df_todas['Precipitacao_mm'] = df_todas['Precipitacao_mm'].fillna(0.0)
+    # Ordenação estável: dentro de cada dia, as cidades seguem a ordem de MS_CITIES
+    df_todas = df_todas.sort_values('Data', kind='mergesort')
+    df_todas = df_todas[['Data', 'Cidade'] + list(COLUNAS_SAIDA.values())]
+
     for year in years:
-        weather_data = []
-        start_date = datetime(year, 1, 1)
-        end_date = datetime(year, 12, 31)
-        current_date = start_date
-        
-        # Cache para armazenar dados já coletados
-        data_cache = {}
-        
-        print(f"\nColetando dados para o ano {year}...")
-        
-        while current_date <= end_date:
-            for city in MS_CITIES:
-                cache_key = f"{city}_{current_date.strftime('%Y-%m-%d')}"
-                
-                # Verifica se os dados já estão em cache
-                if cache_key in data_cache:
-                    data = data_cache[cache_key]
-                else:
-                    data = get_weather_data(city, current_date)
-                    if data:
-                        data_cache[cache_key] = data
-                
-                if data:
-                    weather_data.append({
-                        'Data': current_date.strftime('%Y-%m-%d'),
-                        'Cidade': city,
-                        'Temperatura_C': data['temperatura'] if data['temperatura'] is not None else float('nan'),
-                        'Pressao_hPa': data['pressao'] if data['pressao'] is not None else float('nan'),
-                        'Umidade_Perc': data['umidade'] if data['umidade'] is not None else float('nan'),
-                        'Precipitacao_mm': data['precipitacao'] if data['precipitacao'] is not None else 0.0
-                    })
-            
-            current_date += timedelta(days=1)
-        
-        if weather_data:
-            # Criar DataFrame com dados meteorológicos
-            df_weather = pd.DataFrame(weather_data)
-            
-            # Salvar dados em arquivo CSV específico para o ano
-            weather_file = os.path.join('data', 'dados_meteorologicos', f'dados_meteorologicos_MS_{year}.csv')
-            
-            try:
-                df_weather.to_csv(weather_file, index=False)
-                print(f'Dados meteorológicos de {year} salvos em {weather_file}')
-            except Exception as e:
-                print(f'Erro ao salvar arquivo CSV para {year}: {e}')
-            
-            # Atualizar arquivo de resumo
-            with open('data/README.md', 'w', encoding='utf-8') as f:
-                f.write('# Dados Meteorológicos - Mato Grosso do Sul\n\n')
-                f.write(f'Última atualização: {datetime.now().strftime("%d/%m/%Y %H:%M")}\n\n')
-                f.write('## Resumo dos Dados\n')
-                f.write(f'- Anos disponíveis: 2020-2024\n')
-                f.write(f'- Data da coleta: {datetime.now().strftime("%d/%m/%Y")}\n')
-                f.write(f'- Temperatura média: {df_weather["Temperatura_C"].mean():.1f}°C\n')
-                f.write(f'- Pressão média: {df_weather["Pressao_hPa"].mean():.1f} hPa\n')
-                f.write(f'- Umidade média: {df_weather["Umidade_Perc"].mean():.1f}%\n')
-                f.write('\n## Cidades monitoradas\n')
-                for city in MS_CITIES:
-                    f.write(f'- {city}\n')
-        else:
+        df_weather = df_todas[df_todas['Data'].dt.year == year]
+        if df_weather.empty:
             print(f'Não foi possível obter dados meteorológicos completos para {year}')
+            continue
+
+        # Salvar dados em arquivo CSV específico para o ano
+        weather_file = os.path.join(PASTA_DADOS, f'dados_meteorologicos_MS_{year}.csv')
+        try:
+            df_weather.assign(Data=df_weather['Data'].dt.strftime('%Y-%m-%d')).to_csv(weather_file, index=False)
+            print(f'Dados meteorológicos de {year} salvos em {weather_file}')
+        except Exception as e:
+            print(f'Erro ao salvar arquivo CSV para {year}: {e}')
+
+    # Atualizar arquivo de resumo
+    with open('data/README.md', 'w', encoding='utf-8') as f:
+        f.write('# Dados Meteorológicos - Mato Grosso do Sul\n\n')
+        f.write(f'Última atualização: {datetime.now().strftime("%d/%m/%Y %H:%M")}\n\n')
+        f.write('## Resumo dos Dados\n')
+        f.write(f'- Anos disponíveis: {min(years)}-{max(years)}\n')
+        f.write(f'- Data da coleta: {datetime.now().strftime("%d/%m/%Y")}\n')
+        f.write(f'- Temperatura média: {df_todas["Temperatura_C"].mean():.1f}°C\n')
+        f.write(f'- Pressão média: {df_todas["Pressao_hPa"].mean():.1f} hPa\n')
+        f.write(f'- Umidade média: {df_todas["Umidade_Perc"].mean():.1f}%\n')
+        f.write('\n## Cidades monitoradas\n')
+        for city in MS_CITIES:
+            f.write(f'- {city}\n')
 
 if __name__ == '__main__':
     # Mudar para o diretório do script
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     create_data_directories()
-    extract_and_save_data()
\ No newline at end of file
+    extract_and_save_data()
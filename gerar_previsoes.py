@@ -0,0 +1,57 @@
+import argparse
+import os
+import time
+
+from utils.dependencias import faltantes
+from utils.previsao import HIPERPARAMETROS
+from utils.previsao_lote import gravar_previsoes
+from utils.rebanhos import dobrar_acentos
+
+
+def gerar(modelos=None, uf='MS', csv=False):
+    """Grava em data/previsoes/ a tabela de previsões de cada modelo para todas as combinações"""
+    for modelo in modelos or HIPERPARAMETROS:
+        ausentes = faltantes(modelo)
+        if ausentes:
+            print(f"{modelo}: indisponível ({', '.join(ausentes)} não está instalado)")
+            continue
+
+        inicio = time.perf_counter()
+        ultimo = [0.0]
+
+        def progresso(fracao):
+            # Uma linha a cada 25% concluídos
+            if fracao - ultimo[0] >= 0.25:
+                ultimo[0] = fracao
+                print(f"  {modelo}: {fracao:.0%}")
+
+        tabela, erros, caminho = gravar_previsoes(modelo, uf, progresso)
+        combinacoes = len(tabela[['cultura', 'rebanho']].drop_duplicates())
+        print(f"{modelo}: {combinacoes} combinações, {len(tabela)} linhas -> {caminho} "
+              f"({time.perf_counter() - inicio:.2f}s)")
+        for (cultura, rebanho), mensagem in erros.items():
+            print(f"  erro em {cultura} × {rebanho}: {mensagem}")
+        if csv:
+            tabela.to_csv(os.path.splitext(caminho)[0] + '.csv', index=False)
+
+
+if __name__ == '__main__':
+    # Mudar para o diretório do script
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(
+        description="Gera as previsões de emissão para todas as combinações de cultura e tipo de rebanho.")
+    parser.add_argument('modelos', nargs='*',
+                        help=f"Modelos (ou parte do nome, ex.: linear, arima): {', '.join(HIPERPARAMETROS)} "
+                             "(padrão: todos)")
+    parser.add_argument('--uf', default='MS', help="UF das séries (padrão: MS)")
+    parser.add_argument('--csv', action='store_true', help="Grava também uma cópia em CSV de cada tabela")
+    args = parser.parse_args()
+
+    selecionados = []
+    for nome in args.modelos:
+        encontrados = [m for m in HIPERPARAMETROS if dobrar_acentos(nome) in dobrar_acentos(m)]
+        if len(encontrados) != 1:
+            parser.error(f"modelo desconhecido ou ambíguo: {nome}")
+        selecionados.append(encontrados[0])
+    gerar(selecionados, args.uf, args.csv)
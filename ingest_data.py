@@ -0,0 +1,49 @@
+import argparse
+import os
+import time
+
+from utils import snapshot
+from utils.data_processing import PARTICOES, TABELAS, fontes_tabela
+
+
+def ingerir(tabelas=None, forcar=False):
+    """Normaliza cada fonte bruta uma única vez e grava o snapshot Arrow em data/snapshot/"""
+    if not snapshot.disponivel():
+        raise SystemExit("pyarrow não está instalado. Instale com: pip install pyarrow")
+
+    manifesto = snapshot.ler_manifesto()
+    for nome in tabelas or TABELAS:
+        fontes = fontes_tabela(nome)
+        if not forcar and snapshot.snapshot_valido(nome, fontes, manifesto):
+            print(f"{nome}: snapshot em dia, nada a fazer")
+            continue
+
+        inicio = time.perf_counter()
+        if nome in PARTICOES:
+            # Leitura em blocos com agregação imediata; uma partição por valor da coluna
+            coluna, agregar = PARTICOES[nome]
+            caminho = snapshot.gravar_particoes(nome, agregar(), fontes, coluna)
+            particoes = snapshot.ler_manifesto()[nome]['particoes']
+            print(f"{nome}: {sum(particoes.values())} linhas em {len(particoes)} partição(ões) "
+                  f"por {coluna} -> {caminho} ({time.perf_counter() - inicio:.2f}s)")
+            continue
+        df = TABELAS[nome][1]()
+        caminho = snapshot.gravar_snapshot(nome, df, fontes)
+        print(f"{nome}: {len(df)} linhas, {len(fontes)} fonte(s) -> {caminho} "
+              f"({time.perf_counter() - inicio:.2f}s)")
+
+
+if __name__ == '__main__':
+    # Mudar para o diretório do script
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Gera o snapshot colunar (Feather) dos dados brutos.")
+    parser.add_argument('tabelas', nargs='*',
+                        help=f"Tabelas a ingerir: {', '.join(TABELAS)} (padrão: todas)")
+    parser.add_argument('--forcar', action='store_true',
+                        help="Regrava o snapshot mesmo que o manifesto esteja em dia")
+    args = parser.parse_args()
+    desconhecidas = set(args.tabelas) - set(TABELAS)
+    if desconhecidas:
+        parser.error(f"tabela(s) desconhecida(s): {', '.join(sorted(desconhecidas))}")
+    ingerir(args.tabelas, args.forcar)
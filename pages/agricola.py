@@ -1,113 +1,110 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import os
+from utils.agricola import obter_cubo_agricola
+from utils.data_processing import ARQUIVO_AGRICOLAS
+from utils.graficos import figura_em_cache
 
 # Construir caminho compatível com todos os SOs
-file_path = os.path.join("data", "dados_agricolas", "producao_qtde_produzida.xlsx")
+file_path = ARQUIVO_AGRICOLAS
 
 # Verificar se o arquivo existe
 if not os.path.exists(file_path):
     st.error(f"Arquivo não encontrado: {file_path}")
     st.stop()
 
-# Carregar os dados
-df = pd.read_excel(file_path, header=None)
+# Cubo produto × UF × ano da planilha inteira (montado uma vez por versão do arquivo)
+cubo = obter_cubo_agricola()
 
-# Lista de produtos desejados
-produtos_desejados = ['Soja', 'Algodão', 'Café', 'Laranja', 'Cana de açúcar', 'Grãos', 'Madeira para papel', 'Milho']
-
-# Identificar a primeira coluna (que contém os anos)
-first_column = 0  # Primeira coluna é o índice 0
-
-# Obter o nome dos produtos na primeira linha
-produtos_row = df.iloc[0]
+# Título do aplicativo
+st.title("Produção Agrícola por Estado")
+
+# Seleção de estados, produtos e anos (cada mudança é só um recorte do cubo)
+col_ufs, col_produtos = st.columns(2)
+with col_ufs:
+    ufs = st.multiselect('Estados / regiões', cubo.ufs,
+                         default=['MS'] if 'MS' in cubo.ufs else cubo.ufs[:1])
+with col_produtos:
+    produtos = st.multiselect('Produtos', cubo.produtos, default=cubo.produtos_padrao())
+ano_inicio, ano_fim = st.select_slider('Intervalo de anos', options=cubo.anos,
+                                       value=(cubo.anos[0], cubo.anos[-1]))
+
+if not ufs or not produtos:
+    st.info('Selecione ao menos um estado e um produto.')
+    st.stop()
 
-# Filtrar colunas onde encontramos UF seguido de MS e o produto está na lista desejada
-uf_row = df.iloc[1]
-ms_columns = [col for col, value in uf_row.items() 
-             if value == 'MS' and any(prod.lower() in str(produtos_row[col]).lower() for prod in produtos_desejados)]
 
-# Incluir a primeira coluna e as colunas filtradas
-selected_columns = [first_column] + ms_columns
+def rotulo(produto, uf):
+    return produto if len(ufs) == 1 else f"{produto} ({uf})"
 
-# Criar o DataFrame filtrado
-df_ms = df[selected_columns]
 
-# Título do aplicativo
-st.title("Produção de Mato Grosso do Sul")
+# Recorte em formato largo (uma coluna por produto e UF), sem anos vazios
+df_plot = cubo.tabela(produtos, ufs, ano_inicio, ano_fim).dropna(how='all')
 
 # Exibir os dados filtrados em uma tabela organizada
-st.subheader("Dados da Produção por Produto em MS")
-
-# Renomear as colunas para mostrar apenas o nome do produto
-df_display = df_ms.copy()
-for col in ms_columns:
-    produto_nome = produtos_row[col]
-    df_display = df_display.rename(columns={col: produto_nome})
-
-# Exibir a tabela formatada
-st.dataframe(df_display, use_container_width=True)
-
-# Criar DataFrame para o gráfico de linhas múltiplas
-df_plot = pd.DataFrame()
-df_plot['Ano'] = pd.to_numeric(df_ms[first_column].iloc[2:], errors='coerce')
-
-for produto in ms_columns:
-    produto_nome = produtos_row[produto]
-    valores = df_ms[produto].iloc[2:].astype(str)
-    valores = valores.str.strip()
-    valores = valores[valores != '']
-    valores = pd.to_numeric(valores, errors='coerce')
-    df_plot[produto_nome] = valores
-    df_plot = df_plot.dropna(subset=[produto_nome])
+st.subheader(f"Dados da Produção por Produto em {', '.join(ufs)}")
+df_tabela = df_plot.copy()
+df_tabela.columns = [rotulo(p, u) for p, u in df_tabela.columns]
+st.dataframe(df_tabela.reset_index(), use_container_width=True)
+
 
 # Gráfico de linhas múltiplas com Plotly
-st.subheader("Evolução da Produção por Produto")
-fig_lines = go.Figure()
-
-for produto in ms_columns:
-    produto_nome = produtos_row[produto]
-    fig_lines.add_trace(
-        go.Scatter(
-            x=df_plot['Ano'],
-            y=df_plot[produto_nome],
-            name=produto_nome,
-            mode='lines+markers'
+def plot_evolucao_produtos(df_plot):
+    fig_lines = go.Figure()
+
+    for produto_nome, uf in df_plot.columns:
+        fig_lines.add_trace(
+            go.Scatter(
+                x=df_plot.index,
+                y=df_plot[(produto_nome, uf)],
+                name=rotulo(produto_nome, uf),
+                mode='lines+markers'
+            )
         )
+
+    fig_lines.update_layout(
+        title=f"Evolução da Produção Agrícola - {', '.join(ufs)}",
+        xaxis_title='Ano',
+        yaxis_title='Produção',
+        hovermode='x unified',
+        showlegend=True
     )
+    return fig_lines
 
-fig_lines.update_layout(
-    title='Evolução da Produção Agrícola no MS',
-    xaxis_title='Ano',
-    yaxis_title='Produção',
-    hovermode='x unified',
-    showlegend=True
-)
 
-st.plotly_chart(fig_lines, use_container_width=True)
+# Gráfico de barras empilhadas (produtos somados entre os estados selecionados)
+def plot_composicao_produtos(df_plot):
+    fig_bar = go.Figure()
+    totais = df_plot.T.groupby(level='produto', sort=False).sum(min_count=1).T
 
-# Criar gráfico de barras empilhadas
-st.subheader("Composição da Produção Total por Ano")
-fig_bar = go.Figure()
-
-for produto in ms_columns:
-    produto_nome = produtos_row[produto]
-    fig_bar.add_trace(
-        go.Bar(
-            name=produto_nome,
-            x=df_plot['Ano'],
-            y=df_plot[produto_nome],
+    for produto_nome in totais.columns:
+        fig_bar.add_trace(
+            go.Bar(
+                name=produto_nome,
+                x=totais.index,
+                y=totais[produto_nome],
+            )
         )
+
+    fig_bar.update_layout(
+        title=f"Composição da Produção Agrícola - {', '.join(ufs)}",
+        xaxis_title='Ano',
+        yaxis_title='Produção',
+        barmode='stack',
+        hovermode='x unified'
     )
+    return fig_bar
+
 
-fig_bar.update_layout(
-    title='Composição da Produção Agrícola no MS',
-    xaxis_title='Ano',
-    yaxis_title='Produção',
-    barmode='stack',
-    hovermode='x unified'
-)
+# Figuras reaproveitadas do cache enquanto a planilha e a seleção não mudam
+filtros = dict(ufs=ufs, produtos=produtos, ano_inicio=ano_inicio, ano_fim=ano_fim)
 
-st.plotly_chart(fig_bar, use_container_width=True)
\ No newline at end of file
+st.subheader("Evolução da Produção por Produto")
+fig_lines = figura_em_cache('agricola_evolucao', [file_path],
+                            lambda: plot_evolucao_produtos(df_plot), **filtros)
+st.plotly_chart(fig_lines, use_container_width=True)
+
+st.subheader("Composição da Produção Total por Ano")
+fig_bar = figura_em_cache('agricola_composicao', [file_path],
+                          lambda: plot_composicao_produtos(df_plot), **filtros)
+st.plotly_chart(fig_bar, use_container_width=True)
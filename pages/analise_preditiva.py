@@ -1,16 +1,25 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from app_completo import carregar_agricolas, carregar_rebanhos
+from utils.data_processing import carregar_agricolas, carregar_rebanhos
+from utils.dependencias import faltantes, tabela_tempos
+from utils.previsao import MODELOS_LINEARES, prever, series_da_previsao
+from utils.previsao_lote import (
+    arquivo_previsoes,
+    carregar_previsoes,
+    gravar_previsoes,
+    gravar_tabela,
+    montar_lote,
+    submeter_lote,
+)
+from utils.tarefas import acompanhar, cancelar, submeter
 import os
 
 st.title('Análise Preditiva de Carbono - MS')
 
 # Carregar dados
-df_agricola = carregar_agricolas()
-df_agricola.columns = [str(col) for col in df_agricola.columns]
-df_rebanhos = carregar_rebanhos()
-df_rebanhos.columns = [str(col) for col in df_rebanhos.columns]
+# (rename devolve uma cópia; os DataFrames do cache são compartilhados entre sessões)
+df_agricola = carregar_agricolas().rename(columns=str)
+df_rebanhos = carregar_rebanhos('MS').rename(columns=str)
 
 # NOVO: Gráfico de precipitação anual total de MS (soma das cidades)
 pasta_meteo = os.path.join(os.path.dirname(__file__), '..', 'dados_meteorologicos')
@@ -61,170 +70,86 @@ with st.container():
         "Random Forest"
     ]
     modelo_sel = st.selectbox("Escolha seu modelo de predição", modelos, index=0)
-
-    # Cálculo de emissão (simplificado)
-    if 'Ano' in df_agricola.columns:
-        df_agricola_plot = df_agricola[['Ano', cultura_sel]].copy()
-        df_agricola_plot['Ano'] = df_agricola_plot['Ano'].astype(str)
-        df_agricola_plot['emissao_agricola'] = df_agricola_plot[cultura_sel] / df_agricola_plot[cultura_sel].max() * qtd_cultura
-    else:
-        df_agricola_plot = pd.DataFrame({'Ano': [], 'emissao_agricola': []})
-
-    if 'tipo_rebanho' in df_rebanhos.columns and 'ano' in df_rebanhos.columns:
-        df_rebanho_plot = df_rebanhos[df_rebanhos['tipo_rebanho'] == rebanho_sel][['ano', 'quantidade']].copy()
-        df_rebanho_plot['ano'] = df_rebanho_plot['ano'].astype(str)
-        df_rebanho_plot['emissao_rebanho'] = df_rebanho_plot['quantidade'] / df_rebanho_plot['quantidade'].max() * qtd_rebanho if not df_rebanho_plot['quantidade'].max() == 0 else 0
-    else:
-        df_rebanho_plot = pd.DataFrame({'ano': [], 'emissao_rebanho': []})
-
-    df_emissao = pd.merge(
-        df_agricola_plot[['Ano', 'emissao_agricola']].rename(columns={'Ano': 'ano'}),
-        df_rebanho_plot[['ano', 'emissao_rebanho']],
-        on='ano',
-        how='outer'
-    ).fillna(0)
-    df_emissao['emissao_total'] = df_emissao['emissao_agricola'] + df_emissao['emissao_rebanho']
-    df_emissao = df_emissao.sort_values('ano')
-
-    # Predição baseada no modelo selecionado
-    anos_hist = df_emissao['ano'].astype(int).values
-    emissao_hist = df_emissao['emissao_total'].values
+    if modelo_sel not in MODELOS_LINEARES:
+        st.caption("Só a Regressão Linear responde aos sliders na hora. Nos demais modelos, "
+                   "cada nova proporção entre as quantidades exige um novo ajuste; "
+                   "enquanto ele roda, o gráfico mostra a previsão anterior.")
+
+    def mostrar_erro(e):
+        if isinstance(e, ImportError):
+            st.warning(f"Não foi possível carregar as dependências do modelo {modelo_sel}. "
+                       "Isso pode ser um problema de instalação, ambiente ou dependências de DLL. "
+                       f"Detalhe: {e}")
+        else:
+            st.warning(f"Erro {modelo_sel.split(' (')[0]}: {e}")
+
+    @st.fragment(run_every=0.5)
+    def acompanhar_ajustes(tarefas, texto):
+        """Progresso dos ajustes, consultado a cada meio segundo sem prender a sessão;
+        quando todos terminam, a página é reexecutada e mostra o resultado"""
+        terminadas, fracao = acompanhar(tarefas)
+        if terminadas:
+            st.rerun()
+        st.progress(fracao, text=f"{texto}... {fracao:.0%}")
+
+    def prever_em_segundo_plano(anos_serie, partes):
+        """Submete os ajustes que faltam ao pool de processos; None enquanto não terminam.
+
+        As tarefas da sessão ficam em `st.session_state` (chave -> tarefa); mudar a
+        seleção cancela as tarefas que não servem mais para a previsão atual.
+        """
+        anteriores = st.session_state.get('tarefas_previsao', {})
+        atuais = {}
+        for chave, y, _ in partes:
+            tarefa = anteriores.get(chave)
+            if tarefa is None or tarefa.estado() == 'cancelada':
+                tarefa = submeter(modelo_sel, chave, anos_serie, y)
+            atuais[chave] = tarefa
+        for chave, tarefa in anteriores.items():
+            if chave not in atuais:
+                cancelar(tarefa)
+        st.session_state['tarefas_previsao'] = atuais
+
+        tarefas = list(atuais.values())
+        terminadas, _ = acompanhar(tarefas)
+        if not terminadas:
+            acompanhar_ajustes(tarefas, f"Ajustando {modelo_sel}")
+            return None
+        erros = [t.erro() for t in tarefas if t.erro() is not None]
+        if erros:
+            mostrar_erro(erros[0])
+            return None
+        return prever(modelo_sel, cultura_sel, rebanho_sel, qtd_cultura, qtd_rebanho, ajustar=False)
+
+    # Previsão da emissão (agrícola + rebanho): os ajustes ficam no registro de
+    # modelos (utils/previsao.py) e os sliders apenas reescalam as previsões guardadas.
+    # Modelos não lineares ainda não ajustados rodam em processos separados (utils/tarefas.py).
     df_emissao_plot = pd.DataFrame(columns=['emissao_total'])
-
-    if len(anos_hist) >= 2:
-        if modelo_sel == "Regressão Linear":
-            coef = np.polyfit(anos_hist, emissao_hist, 1)
-            poly = np.poly1d(coef)
-            ano_max = anos_hist.max()
-            anos_pred = np.arange(ano_max + 1, ano_max + 6)
-            emissao_pred = poly(anos_pred)
-            df_pred = pd.DataFrame({
-                'ano': anos_pred.astype(str),
-                'emissao_total': emissao_pred
-            })
-            df_emissao_plot = df_pred.set_index('ano')
-
-        elif modelo_sel == "ARIMA/SARIMA":
-            from statsmodels.tsa.arima.model import ARIMA
-            try:
-                model = ARIMA(emissao_hist, order=(1,1,1))
-                model_fit = model.fit()
-                forecast = model_fit.forecast(steps=5)
-                ano_max = anos_hist.max()
-                anos_pred = np.arange(ano_max + 1, ano_max + 6)
-                df_pred = pd.DataFrame({
-                    'ano': anos_pred.astype(str),
-                    'emissao_total': forecast
-                })
-                df_emissao_plot = df_pred.set_index('ano')
-            except Exception as e:
-                st.warning(f"Erro ARIMA/SARIMA: {e}")
-
-        elif modelo_sel == "Prophet":
-            try:
-                from prophet import Prophet
-                df_prophet = pd.DataFrame({
-                    'ds': pd.to_datetime(df_emissao['ano'], format='%Y'),
-                    'y': df_emissao['emissao_total']
-                })
-                m = Prophet(yearly_seasonality=False, daily_seasonality=False, weekly_seasonality=False)
-                m.fit(df_prophet)
-                future = m.make_future_dataframe(periods=5, freq='Y')
-                forecast = m.predict(future)
-                forecast_pred = forecast.tail(5)
-                anos_pred = forecast_pred['ds'].dt.year.astype(str).values
-                emissao_pred = forecast_pred['yhat'].values
-                df_pred = pd.DataFrame({
-                    'ano': anos_pred,
-                    'emissao_total': emissao_pred
-                })
-                df_emissao_plot = df_pred.set_index('ano')
-            except Exception as e:
-                st.warning(f"Erro Prophet: {e}")
-
-        elif modelo_sel == "Random Forest":
-            try:
-                from sklearn.ensemble import RandomForestRegressor
-                X = anos_hist.reshape(-1, 1)
-                y = emissao_hist
-                rf = RandomForestRegressor(n_estimators=100)
-                rf.fit(X, y)
-                ano_max = anos_hist.max()
-                anos_pred = np.arange(ano_max + 1, ano_max + 6)
-                emissao_pred = rf.predict(anos_pred.reshape(-1, 1))
-                df_pred = pd.DataFrame({
-                    'ano': anos_pred.astype(str),
-                    'emissao_total': emissao_pred
-                })
-                df_emissao_plot = df_pred.set_index('ano')
-            except Exception as e:
-                st.warning(f"Erro Random Forest: {e}")
-
-        elif modelo_sel == "LSTM (Deep Learning)":
-            try:
-                import importlib.util
-                tf_spec = importlib.util.find_spec("tensorflow")
-                if tf_spec is None:
-                    st.warning("TensorFlow não está instalado. Para usar LSTM, adicione 'tensorflow' ao seu requirements.txt e instale.")
-                else:
-                    try:
-                        # Testa se o TensorFlow pode ser importado e inicializado corretamente
-                        import tensorflow as tf
-                        from tensorflow import keras
-                        from sklearn.preprocessing import MinMaxScaler
-
-                        # Teste rápido de inicialização de sessão para evitar erro de DLL
-                        try:
-                            _ = tf.constant([0.0])
-                        except Exception as e:
-                            st.warning("TensorFlow está instalado, mas não pôde ser carregado corretamente (erro de ambiente/DLL). "
-                                       "Considere reinstalar o TensorFlow ou usar um ambiente compatível. "
-                                       f"Detalhe: {e}")
-                            raise RuntimeError("TensorFlow DLL error")
-
-                        scaler = MinMaxScaler()
-                        y_scaled = scaler.fit_transform(emissao_hist.reshape(-1, 1))
-
-                        X_lstm = []
-                        y_lstm = []
-                        for i in range(1, len(y_scaled)):
-                            X_lstm.append(y_scaled[i-1:i, 0])
-                            y_lstm.append(y_scaled[i, 0])
-                        X_lstm, y_lstm = np.array(X_lstm), np.array(y_lstm)
-
-                        X_lstm = X_lstm.reshape((X_lstm.shape[0], 1, 1))
-
-                        model = keras.Sequential([
-                            keras.layers.LSTM(10, input_shape=(1, 1)),
-                            keras.layers.Dense(1)
-                        ])
-                        model.compile(optimizer='adam', loss='mse')
-                        model.fit(X_lstm, y_lstm, epochs=100, verbose=0)
-
-                        last_value = y_scaled[-1].reshape(1, 1, 1)
-                        preds = []
-                        for _ in range(5):
-                            pred = model.predict(last_value, verbose=0)
-                            preds.append(pred[0, 0])
-                            last_value = pred.reshape(1, 1, 1)
-                        emissao_pred = scaler.inverse_transform(np.array(preds).reshape(-1, 1)).flatten()
-                        ano_max = anos_hist.max()
-                        anos_pred = np.arange(ano_max + 1, ano_max + 6)
-                        df_pred = pd.DataFrame({
-                            'ano': anos_pred.astype(str),
-                            'emissao_total': emissao_pred
-                        })
-                        df_emissao_plot = df_pred.set_index('ano')
-                    except RuntimeError:
-                        pass  # Mensagem já exibida acima
-                    except ImportError as e:
-                        st.warning("TensorFlow está instalado, mas não pôde ser carregado corretamente. "
-                                   "Isso pode ser um problema de instalação, ambiente ou dependências de DLL. "
-                                   "Considere reinstalar o TensorFlow ou verificar se sua instalação é compatível com seu sistema operacional.")
-                    except Exception as e:
-                        st.warning(f"Erro LSTM: {e}")
-            except Exception as e:
-                st.warning(f"Erro LSTM: {e}")
+    # Disponibilidade das bibliotecas descoberta uma vez por processo (utils/dependencias.py)
+    ausentes = faltantes(modelo_sel)
+    if ausentes:
+        st.warning(f"{', '.join(ausentes)} não está instalado. Para usar {modelo_sel}, "
+                   f"adicione {', '.join(repr(a) for a in ausentes)} ao seu requirements.txt e instale.")
+    else:
+        try:
+            previsao = prever(modelo_sel, cultura_sel, rebanho_sel, qtd_cultura, qtd_rebanho,
+                              ajustar=modelo_sel in MODELOS_LINEARES)
+            if previsao is None:
+                previsao = prever_em_segundo_plano(*series_da_previsao(
+                    modelo_sel, cultura_sel, rebanho_sel, qtd_cultura, qtd_rebanho))
+            # Última previsão da seleção (modelo, cultura, rebanho), mantida no gráfico
+            # enquanto o ajuste de uma nova proporção roda em segundo plano
+            selecao = (modelo_sel, cultura_sel, rebanho_sel)
+            if previsao is not None:
+                df_emissao_plot = previsao
+                st.session_state['ultima_previsao'] = (selecao, previsao)
+            else:
+                selecao_anterior, previsao_anterior = st.session_state.get('ultima_previsao', (None, None))
+                if selecao_anterior == selecao:
+                    df_emissao_plot = previsao_anterior
+                    st.caption("Previsão anterior; o gráfico é atualizado quando o novo ajuste terminar.")
+        except Exception as e:
+            mostrar_erro(e)
 
     st.subheader(f'Emissão de Carbono (Agrícola + Rebanho) - Modelo: {modelo_sel}')
     st.line_chart(
@@ -233,3 +158,47 @@ with st.container():
     )
     st.caption("Valores previstos para os próximos 5 anos:")
     st.dataframe(df_emissao_plot.reset_index().rename(columns={'ano': 'Ano', 'emissao_total': 'Emissão Prevista'}))
+
+    with st.expander("Tempos de carregamento dos modelos"):
+        st.caption("Import de cada biblioteca e duração do primeiro ajuste de cada modelo neste servidor (s).")
+        st.dataframe(pd.DataFrame(tabela_tempos()), use_container_width=True)
+
+# Previsões de todas as combinações de cultura e tipo de rebanho (quantidades padrão),
+# gravadas em data/previsoes/ e reaproveitadas enquanto os dados não mudam
+st.header("Previsões em Lote")
+tabela_lote = carregar_previsoes(modelo_sel)
+# Lotes em andamento da sessão: modelo -> tarefas (ver utils.previsao_lote.submeter_lote)
+lotes = st.session_state.setdefault('lotes_previsao', {})
+if st.button(f"Gerar previsões de {modelo_sel} para todas as combinações",
+             disabled=bool(ausentes) or modelo_sel in lotes):
+    if modelo_sel in MODELOS_LINEARES:
+        # Mínimos quadrados empilhados: todas as combinações em milissegundos
+        tabela_lote, _, _ = gravar_previsoes(modelo_sel)
+    else:
+        lotes[modelo_sel] = submeter_lote(modelo_sel)
+
+if modelo_sel in lotes:
+    tarefas_lote = list(lotes[modelo_sel].values())
+    if acompanhar(tarefas_lote)[0]:
+        tabela_lote, erros_lote = montar_lote(modelo_sel, lotes.pop(modelo_sel))
+        gravar_tabela(modelo_sel, tabela_lote)
+        if erros_lote:
+            st.warning(f"{len(erros_lote)} combinação(ões) sem previsão: "
+                       + "; ".join(f"{c} × {r}: {m}" for (c, r), m in list(erros_lote.items())[:3]))
+    else:
+        acompanhar_ajustes(tarefas_lote, f"Gerando previsões de {modelo_sel}")
+
+if tabela_lote is not None:
+    st.dataframe(
+        tabela_lote.pivot_table(index=['cultura', 'rebanho'], columns='ano', values='emissao_total'),
+        use_container_width=True
+    )
+    st.download_button(
+        "Baixar tabela (CSV)",
+        tabela_lote.to_csv(index=False).encode('utf-8'),
+        file_name=os.path.basename(arquivo_previsoes(modelo_sel)).replace('.feather', '.csv'),
+        mime='text/csv'
+    )
+else:
+    st.caption("Ainda não há previsões em lote deste modelo para a versão atual dos dados "
+               "(gere pelo botão acima ou com `python gerar_previsoes.py`).")
@@ -5,230 +5,103 @@ import plotly.graph_objects as go
 from pathlib import Path
 import re
 import folium
-from streamlit_folium import folium_static
+import streamlit.components.v1 as components
+from utils.data_processing import listar_arquivos_meteo
+from utils.graficos import PONTOS_POR_FIGURA, figura_em_cache, html_em_cache, reduzir_serie
+from utils.meteo import RESOLUCOES, carregar_catalogo_estacoes, obter_base_estacoes, obter_climatologia
 
 st.set_page_config(page_title="Análise Meteorológica", layout="wide")
 st.title("Análise Meteorológica por Cidade")
 
-# Função para extrair informações da cidade do arquivo
-def get_city_info(file_path):
-    info = {'nome': None, 'latitude': None, 'longitude': None}
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line_lower = line.lower()
-            if 'nome:' in line_lower:
-                info['nome'] = line.split(':')[1].strip()
-            elif 'latitude:' in line_lower:
-                info['latitude'] = float(line.split(':')[1].strip())
-            elif 'longitude:' in line_lower:
-                info['longitude'] = float(line.split(':')[1].strip())
-    return info
 
-# Função para ler e processar os dados meteorológicos
-def process_meteo_data(file_path):
-    # Pular as primeiras 10 linhas e ler o restante como CSV
-    df = pd.read_csv(file_path, skiprows=10, sep=';')
-    
-    # Mapear os nomes das colunas corretamente
-    colunas_esperadas = {
-        'Data Medicao': 'Data',
-        'NUMERO DE DIAS COM PRECIP. PLUV, MENSAL (AUT)(número)': 'DiasPrecipitacao',
-        'PRECIPITACAO TOTAL, MENSAL (AUT)(mm)': 'PrecipitacaoTotal',
-        'PRESSAO ATMOSFERICA, MEDIA MENSAL (AUT)(mB)': 'PressaoAtmosferica',
-        'TEMPERATURA MEDIA, MENSAL (AUT)(°C)': 'TemperaturaMedia',
-        'VENTO, VELOCIDADE MAXIMA MENSAL (AUT)(m/s)': 'VentoVelocidadeMaxima',
-        'VENTO, VELOCIDADE MEDIA MENSAL (AUT)(m/s)': 'VentoVelocidadeMedia'
-    }
-    
-    # Renomear as colunas usando o mapeamento
-    df = df.rename(columns=colunas_esperadas)
-    
-    # Converter a coluna de data
-    df['Data'] = pd.to_datetime(df['Data'])
-    df['Mes'] = df['Data'].dt.month
-    
-    # Converter valores nulos ('null') para NaN
-    df = df.replace('null', pd.NA)
-    
-    # Converter colunas para tipo numérico
-    colunas_numericas = df.columns.drop(['Data', 'Mes'])
-    for col in colunas_numericas:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    return df
-
-# Caminho para a pasta de dados meteorológicos
-data_dir = Path('data/dados_meteorologicos')
-
-# Listar todos os arquivos CSV
-csv_files = [f for f in data_dir.glob('*.csv')]
+ALTURA_MAPA = 500
 
-# Criar dicionário com informações das cidades
-city_info = {}
-for f in csv_files:
-    info = get_city_info(f)
-    if info['nome']:
-        city_info[info['nome']] = {
-            'file': f,
-            'latitude': info['latitude'],
-            'longitude': info['longitude']
-        }
-
-city_names = sorted(list(city_info.keys()))
-
-selected_cities = st.multiselect('Selecione as cidades para comparação:', city_names)
 
-if selected_cities:
-    # Processar dados das cidades selecionadas
-    city_data = {}
-    for city in selected_cities:
-        city_data[city] = process_meteo_data(city_info[city]['file'])
-    
-    # Criar mapa com as cidades selecionadas usando Folium
+def mapa_folium(city_info, cidades):
+    """HTML do mapa do folium com as cidades selecionadas"""
     m = folium.Map(location=[-20, -55], zoom_start=6)
-    
+
     # Adicionar marcadores para cada cidade selecionada
-    for city in selected_cities:
+    for city in cidades:
         folium.Marker(
             location=[city_info[city]['latitude'], city_info[city]['longitude']],
             popup=f"<b>{city}</b>",
             tooltip=city
         ).add_to(m)
-    
+
     # Ajustar o zoom para mostrar todas as cidades selecionadas
-    if selected_cities:
-        lats = [city_info[city]['latitude'] for city in selected_cities]
-        lons = [city_info[city]['longitude'] for city in selected_cities]
-        m.fit_bounds([[min(lats), min(lons)], [max(lats), max(lons)]])
-    
-    # Exibir o mapa
-    st.write('Localização das Cidades Selecionadas')
-    folium_static(m)
-    
-    # Layout para múltiplos gráficos: 3 colunas por linha
-    col_temp, col_precip, col_press = st.columns(3)
-    col_vmax, col_vmed, col_dias = st.columns(3)
+    lats = [city_info[city]['latitude'] for city in cidades]
+    lons = [city_info[city]['longitude'] for city in cidades]
+    m.fit_bounds([[min(lats), min(lons)], [max(lats), max(lons)]])
+    return folium.Figure().add_child(m).render()
 
-    # Gráfico 1: Boxplot de temperatura por mês
-    with col_temp:
-        fig_temp = go.Figure()
-        for city in selected_cities:
-            df = city_data[city]
-            fig_temp.add_trace(go.Box(
-                x=df['Mes'],
-                y=df['TemperaturaMedia'],
-                name=city
-            ))
-        fig_temp.update_layout(
-            title='Distribuição de Temperatura Média por Mês',
-            xaxis_title='Mês',
-            yaxis_title='Temperatura Média (°C)'
-        )
-        st.plotly_chart(fig_temp, use_container_width=True)
 
-    # Gráfico 2: Linha temporal de Precipitação Total
-    with col_precip:
-        fig_precip = go.Figure()
-        for city in selected_cities:
-            df = city_data[city]
-            fig_precip.add_trace(go.Scatter(
-                x=df['Data'],
-                y=df['PrecipitacaoTotal'],
-                name=city,
-                mode='lines'
-            ))
-        fig_precip.update_layout(
-            title='Precipitação Total ao Longo do Tempo',
-            xaxis_title='Data',
-            yaxis_title='Precipitação Total (mm)'
-        )
-        st.plotly_chart(fig_precip, use_container_width=True)
+def mapa_estacoes(catalogo, cidades):
+    """Mapa nativo do Plotly com todas as estações, destacando as selecionadas"""
+    estacoes = catalogo.dropna(subset=['nome', 'latitude', 'longitude'])
+    selecionada = estacoes['nome'].isin(cidades)
+    fig = go.Figure()
+    for nome_grupo, grupo, cor, tamanho in [
+        ('Demais estações', estacoes[~selecionada], '#7f8c8d', 8),
+        ('Selecionadas', estacoes[selecionada], '#d62728', 14),
+    ]:
+        fig.add_trace(go.Scattermapbox(
+            lat=grupo['latitude'],
+            lon=grupo['longitude'],
+            text=grupo['nome'],
+            hoverinfo='text',
+            mode='markers',
+            marker=dict(size=tamanho, color=cor),
+            name=nome_grupo
+        ))
+    fig.update_layout(
+        mapbox=dict(
+            style='open-street-map',
+            center=dict(lat=estacoes['latitude'].mean(), lon=estacoes['longitude'].mean()),
+            zoom=5
+        ),
+        height=ALTURA_MAPA,
+        margin=dict(l=0, r=0, t=0, b=0),
+        legend=dict(x=0, y=1)
+    )
+    return fig
 
-    # Gráfico 3: Linha temporal de Pressão Atmosférica
-    with col_press:
-        fig_press = go.Figure()
-        for city in selected_cities:
-            df = city_data[city]
-            fig_press.add_trace(go.Scatter(
-                x=df['Data'],
-                y=df['PressaoAtmosferica'],
-                name=city,
-                mode='lines'
-            ))
-        fig_press.update_layout(
-            title='Pressão Atmosférica ao Longo do Tempo',
-            xaxis_title='Data',
-            yaxis_title='Pressão Atmosférica (mB)'
-        )
-        st.plotly_chart(fig_press, use_container_width=True)
 
-    # Gráfico 4: Linha temporal de Velocidade Máxima do Vento
-    with col_vmax:
-        fig_vmax = go.Figure()
-        for city in selected_cities:
-            df = city_data[city]
-            fig_vmax.add_trace(go.Scatter(
-                x=df['Data'],
-                y=df['VentoVelocidadeMaxima'],
-                name=city,
-                mode='lines'
-            ))
-        fig_vmax.update_layout(
-            title='Velocidade Máxima do Vento ao Longo do Tempo',
-            xaxis_title='Data',
-            yaxis_title='Velocidade Máxima (m/s)'
-        )
-        st.plotly_chart(fig_vmax, use_container_width=True)
+def plot_temperatura_mensal(clima, cidades, codigos):
+    fig_temp = go.Figure()
+    for city, codigo in zip(cidades, codigos):
+        mensal = clima.mes_a_mes(codigo, 'TemperaturaMedia')
+        mensal = mensal[mensal['contagem'] > 0]
+        fig_temp.add_trace(go.Box(
+            x=mensal.index,
+            q1=mensal['q1'],
+            median=mensal['mediana'],
+            q3=mensal['q3'],
+            lowerfence=mensal['minimo'],
+            upperfence=mensal['maximo'],
+            mean=mensal['media'],
+            name=city
+        ))
+    fig_temp.update_layout(
+        title='Distribuição de Temperatura Média por Mês',
+        xaxis_title='Mês',
+        yaxis_title='Temperatura Média (°C)'
+    )
+    return fig_temp
 
-    # Gráfico 5: Linha temporal de Velocidade Média do Vento
-    with col_vmed:
-        fig_vmed = go.Figure()
-        for city in selected_cities:
-            df = city_data[city]
-            fig_vmed.add_trace(go.Scatter(
-                x=df['Data'],
-                y=df['VentoVelocidadeMedia'],
-                name=city,
-                mode='lines'
-            ))
-        fig_vmed.update_layout(
-            title='Velocidade Média do Vento ao Longo do Tempo',
-            xaxis_title='Data',
-            yaxis_title='Velocidade Média (m/s)'
-        )
-        st.plotly_chart(fig_vmed, use_container_width=True)
 
-    # Gráfico 6: Linha temporal de Número de Dias com Precipitação
-    with col_dias:
-        fig_dias = go.Figure()
-        for city in selected_cities:
-            df = city_data[city]
-            fig_dias.add_trace(go.Scatter(
-                x=df['Data'],
-                y=df['DiasPrecipitacao'],
-                name=city,
-                mode='lines'
-            ))
-        fig_dias.update_layout(
-            title='Número de Dias com Precipitação ao Longo do Tempo',
-            xaxis_title='Data',
-            yaxis_title='Dias com Precipitação'
-        )
-        st.plotly_chart(fig_dias, use_container_width=True)
-
-    # Gráfico de barras: Média de precipitação total por cidade + Estado
-    st.markdown("### Média de Precipitação Total (mm) por Cidade e Estado")
-    # Calcular média de precipitação por cidade
-    medias_precip = {city: df['PrecipitacaoTotal'].mean() for city, df in city_data.items()}
+def plot_media_precipitacao(clima, cidades, codigos):
+    # Média de precipitação por cidade (média de longo prazo da climatologia)
+    medias_precip = dict(zip(cidades, clima.medias(codigos, 'PrecipitacaoTotal').tolist()))
     # Calcular média do estado (média das cidades)
     media_estado = sum(medias_precip.values()) / len(medias_precip) if medias_precip else 0
 
-    cidades = list(medias_precip.keys()) + ["Estado"]
+    rotulos = list(medias_precip.keys()) + ["Estado"]
     medias = list(medias_precip.values()) + [media_estado]
 
     # Definir cores do roxo ao amarelo (usando escala 'plasma' invertida)
     fig_bar = px.bar(
-        x=cidades,
+        x=rotulos,
         y=medias,
         color=medias,
         color_continuous_scale=px.colors.sequential.Plasma[::-1],
@@ -243,15 +116,151 @@ if selected_cities:
         coloraxis_showscale=False,
         yaxis=dict(range=[0, max(medias)*1.15])
     )
+    return fig_bar
+
+
+def plot_serie(series, variavel, titulo, eixo_y):
+    """Linha temporal de uma variável, uma série por cidade, dentro do orçamento de pontos"""
+    pontos_por_serie = max(PONTOS_POR_FIGURA // max(len(series), 1), 3)
+    fig = go.Figure()
+    for city, df in series.items():
+        datas, valores = reduzir_serie(df['Data'].to_numpy(), df[variavel].to_numpy(), pontos_por_serie)
+        fig.add_trace(go.Scatter(
+            x=datas,
+            y=valores,
+            name=city,
+            mode='lines'
+        ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title='Data',
+        yaxis_title=eixo_y
+    )
+    return fig
+
+
+def tabela_anomalias(clima, cidades, codigos, variavel, inicio, fim):
+    """Anomalias mensais de uma variável no período, uma coluna por cidade"""
+    colunas = {}
+    for city, codigo in zip(cidades, codigos):
+        anomalias = clima.anomalias_estacao(codigo).set_index('Data')[variavel]
+        colunas[city] = anomalias.loc[pd.Timestamp(inicio):pd.Timestamp(fim)]
+    tabela = pd.DataFrame(colunas)
+    tabela.index = tabela.index.strftime('%m/%Y')
+    tabela.index.name = 'Mês'
+    return tabela
+
+
+# Criar dicionário com informações das cidades a partir do catálogo das estações
+# (lido do índice persistido; só cabeçalhos de arquivos novos/alterados são relidos)
+catalogo = carregar_catalogo_estacoes()
+city_info = {}
+for estacao in catalogo.dropna(subset=['nome']).itertuples():
+    city_info[estacao.nome] = {
+        'codigo': estacao.codigo,
+        'file': Path(estacao.arquivo),
+        'latitude': estacao.latitude,
+        'longitude': estacao.longitude
+    }
+
+city_names = sorted(list(city_info.keys()))
+if not city_names:
+    st.info('Nenhum arquivo de estação do INMET encontrado em data/dados_meteorologicos.')
+
+selected_cities = st.multiselect('Selecione as cidades para comparação:', city_names)
+
+if selected_cities:
+    # Base longa só das estações selecionadas, montada do cache por estação: ao
+    # acrescentar uma cidade, apenas o arquivo dela é lido (utils/meteo.py)
+    codigos = [city_info[city]['codigo'] for city in selected_cities]
+    base = obter_base_estacoes(codigos)
+
+    # Intervalo de datas e resolução das linhas temporais (agregação feita aqui, antes do gráfico)
+    selecao = base.selecionar(codigos)
+    data_min, data_max = selecao['Data'].min().date(), selecao['Data'].max().date()
+    col_periodo, col_resolucao = st.columns([3, 1])
+    with col_periodo:
+        data_inicio, data_fim = st.slider(
+            'Período', min_value=data_min, max_value=data_max,
+            value=(data_min, data_max), format='MM/YYYY'
+        )
+    with col_resolucao:
+        resolucao = st.radio('Resolução', list(RESOLUCOES), horizontal=True)
+    agregado = base.agregar(codigos, inicio=data_inicio, fim=data_fim, resolucao=resolucao)
+    por_codigo = dict(tuple(agregado.groupby('codigo_estacao', observed=True, sort=False)))
+    city_data = {city: por_codigo[codigo] for city, codigo in zip(selected_cities, codigos) if codigo in por_codigo}
+    # Climatologia pré-calculada (quartis por mês, médias de longo prazo, describe)
+    clima = obter_climatologia(codigos)
+    
+    # Mapa das estações: o nativo do Plotly só envia as coordenadas; o do folium
+    # é renderizado uma vez por conjunto de cidades e reaproveitado do cache
+    fontes_meteo = listar_arquivos_meteo()
+    cidades = tuple(selected_cities)
+    st.write('Localização das Cidades Selecionadas')
+    tipo_mapa = st.radio('Mapa', ['Todas as estações (Plotly)', 'Cidades selecionadas (Folium)'],
+                         horizontal=True, label_visibility='collapsed')
+    if tipo_mapa.endswith('(Plotly)'):
+        fig_mapa = figura_em_cache('meteo_mapa_estacoes', fontes_meteo,
+                                   lambda: mapa_estacoes(catalogo, cidades), cidades=cidades)
+        st.plotly_chart(fig_mapa, use_container_width=True)
+    else:
+        html_mapa = html_em_cache('meteo_mapa_folium', fontes_meteo,
+                                  lambda: mapa_folium(city_info, cidades), cidades=cidades)
+        components.html(html_mapa, height=ALTURA_MAPA + 10, width=700)
+    
+    # Layout para múltiplos gráficos: 3 colunas por linha
+    col_temp, col_precip, col_press = st.columns(3)
+    col_vmax, col_vmed, col_dias = st.columns(3)
+
+    # Figuras reaproveitadas do cache enquanto cidades, filtros e arquivos não mudam
+    # Gráfico 1: Boxplot de temperatura por mês (quartis e extremos já calculados)
+    with col_temp:
+        fig_temp = figura_em_cache('meteo_temperatura_mensal', fontes_meteo,
+                                   lambda: plot_temperatura_mensal(clima, selected_cities, codigos),
+                                   cidades=cidades)
+        st.plotly_chart(fig_temp, use_container_width=True)
+
+    # Gráficos 2 a 6: linhas temporais no período e resolução escolhidos
+    filtros_series = dict(cidades=cidades, inicio=data_inicio, fim=data_fim, resolucao=resolucao)
+    series = [
+        (col_precip, 'PrecipitacaoTotal', 'Precipitação Total ao Longo do Tempo', 'Precipitação Total (mm)'),
+        (col_press, 'PressaoAtmosferica', 'Pressão Atmosférica ao Longo do Tempo', 'Pressão Atmosférica (mB)'),
+        (col_vmax, 'VentoVelocidadeMaxima', 'Velocidade Máxima do Vento ao Longo do Tempo', 'Velocidade Máxima (m/s)'),
+        (col_vmed, 'VentoVelocidadeMedia', 'Velocidade Média do Vento ao Longo do Tempo', 'Velocidade Média (m/s)'),
+        (col_dias, 'DiasPrecipitacao', 'Número de Dias com Precipitação ao Longo do Tempo', 'Dias com Precipitação'),
+    ]
+    for coluna, variavel, titulo, eixo_y in series:
+        with coluna:
+            fig = figura_em_cache(f'meteo_serie_{variavel}', fontes_meteo,
+                                  lambda: plot_serie(city_data, variavel, titulo, eixo_y),
+                                  **filtros_series)
+            st.plotly_chart(fig, use_container_width=True)
+
+    # Gráfico de barras: Média de precipitação total por cidade + Estado
+    st.markdown("### Média de Precipitação Total (mm) por Cidade e Estado")
+    fig_bar = figura_em_cache('meteo_media_precipitacao', fontes_meteo,
+                              lambda: plot_media_precipitacao(clima, selected_cities, codigos),
+                              cidades=cidades)
     st.plotly_chart(fig_bar, use_container_width=True)
 
-    # Mostrar estatísticas básicas para cada cidade
-    for city in selected_cities:
+    # Mostrar estatísticas básicas para cada cidade (pré-calculadas na climatologia)
+    rotulos_stats = {
+        'TemperaturaMedia': 'Temperatura Média (°C)',
+        'PrecipitacaoTotal': 'Precipitação Total (mm)',
+        'PressaoAtmosferica': 'Pressão Atmosférica (mB)',
+        'VentoVelocidadeMaxima': 'Velocidade Máxima do Vento (m/s)',
+        'VentoVelocidadeMedia': 'Velocidade Média do Vento (m/s)',
+    }
+    variaveis_stats = list(rotulos_stats)
+    for city, codigo in zip(selected_cities, codigos):
         st.subheader(f'Estatísticas Básicas - {city}')
-        df = city_data[city]
-        stats = df[['TemperaturaMedia', 'PrecipitacaoTotal', 'PressaoAtmosferica', 
-                    'VentoVelocidadeMaxima', 'VentoVelocidadeMedia']].describe()
-        stats.columns = ['Temperatura Média (°C)', 'Precipitação Total (mm)', 
-                        'Pressão Atmosférica (mB)', 'Velocidade Máxima do Vento (m/s)',
-                        'Velocidade Média do Vento (m/s)']
-        st.dataframe(stats)
\ No newline at end of file
+        stats = clima.descricao(codigo, variaveis_stats)
+        stats.columns = [rotulos_stats[v] for v in variaveis_stats]
+        st.dataframe(stats)
+
+    # Anomalias mensais (desvio de cada mês em relação à média daquele mês do
+    # ano na mesma estação), já calculadas na climatologia
+    st.markdown("### Anomalias Mensais por Cidade")
+    variavel_anomalia = st.selectbox('Variável', variaveis_stats, format_func=rotulos_stats.get)
+    st.dataframe(tabela_anomalias(clima, selected_cities, codigos, variavel_anomalia, data_inicio, data_fim)
+                 .style.format('{:+.2f}', na_rep='-'))
\ No newline at end of file
@@ -1,39 +1,33 @@
 import streamlit as st
 import plotly.graph_objects as go
-import pandas as pd
+import numpy as np
+from utils.data_processing import listar_ufs_rebanhos, nomes_ufs
+from utils.graficos import figura_em_cache
+from utils.rebanhos import FONTES_REBANHO, obter_cubo_rebanho, obter_mapa_rebanho
 
 def mostrar_dados_rebanhos():
+    # Estado analisado (qualquer UF presente nos dados; MS por padrão)
+    ufs = listar_ufs_rebanhos()
+    uf = st.sidebar.selectbox('Estado', ufs, index=ufs.index('MS') if 'MS' in ufs else 0)
+
     col1, col2 = st.columns([6, 1])
     with col1:
-        st.title('Análise dos Rebanhos no Mato Grosso do Sul')
+        st.title(f"Análise dos Rebanhos - {nomes_ufs().get(uf, uf)}")
     with col2:
         if st.button('Voltar', use_container_width=True):
             st.switch_page('index.py')
 
-    # Carregar dados dos rebanhos
-    def carregar_dados_rebanho():
+    # Carregar os agregados dos rebanhos (cubo calculado uma vez por versão dos dados)
+    def carregar_cubo_rebanho():
         try:
-            # Carregar dados do IBGE
-            df_rebanho = pd.read_csv('data/dados_rebanho/br_ibge_ppm_efetivo_rebanhos.csv', sep=';')
-            df_municipios = pd.read_csv('data/dados_rebanho/br_bd_diretorios_brasil_municipio.csv')
-            
-            # Filtrar apenas dados do MS
-            df_rebanho = df_rebanho[df_rebanho['sigla_uf'] == 'MS']
-            
-            # Mesclar com dados dos municípios
-            df_rebanho = pd.merge(df_rebanho, 
-                                 df_municipios[['id_municipio', 'nome']], 
-                                 on='id_municipio', 
-                                 how='left')
-            
-            return df_rebanho
+            return obter_cubo_rebanho(uf)
         except Exception as e:
             st.error(f'Erro ao carregar dados dos rebanhos: {str(e)}')
             return None
 
-    def plot_evolucao_rebanho(df):
-        # Agrupar por ano e tipo de rebanho
-        df_evolucao = df.groupby(['ano', 'tipo_rebanho'])['quantidade'].sum().reset_index()
+    def plot_evolucao_rebanho(cubo, ano_inicio, ano_fim):
+        # Totais por ano e tipo de rebanho no intervalo (pré-calculados no cubo)
+        df_evolucao = cubo.evolucao(ano_inicio, ano_fim)
         
         # Criar gráfico de linhas
         fig = go.Figure()
@@ -55,12 +49,9 @@ def mostrar_dados_rebanhos():
         
         return fig
 
-    def plot_composicao_rebanho(df, ano):
-        # Filtrar dados do ano selecionado
-        df_ano = df[df['ano'] == ano]
-        
-        # Agrupar por tipo de rebanho
-        df_composicao = df_ano.groupby('tipo_rebanho')['quantidade'].sum()
+    def plot_composicao_rebanho(cubo, ano):
+        # Total por tipo de rebanho no ano selecionado
+        df_composicao = cubo.composicao(ano)
         
         # Criar gráfico de pizza
         fig = go.Figure(data=[go.Pie(
@@ -76,10 +67,9 @@ def mostrar_dados_rebanhos():
         
         return fig
 
-    def plot_taxa_crescimento(df):
-        # Calcular taxa de crescimento ano a ano
-        df_crescimento = df.groupby(['ano', 'tipo_rebanho'])['quantidade'].sum().reset_index()
-        df_crescimento['taxa_crescimento'] = df_crescimento.groupby('tipo_rebanho')['quantidade'].pct_change() * 100
+    def plot_taxa_crescimento(cubo, ano_inicio, ano_fim):
+        # Taxa de crescimento ano a ano no intervalo (pré-calculada no cubo)
+        df_crescimento = cubo.evolucao(ano_inicio, ano_fim)
         
         # Criar gráfico de barras
         fig = go.Figure()
@@ -101,12 +91,9 @@ def mostrar_dados_rebanhos():
         
         return fig
 
-    def plot_distribuicao_municipios(df, ano):
-        # Filtrar dados do ano selecionado
-        df_ano = df[df['ano'] == ano]
-        
-        # Agrupar por município
-        df_municipios = df_ano.groupby(['nome', 'tipo_rebanho'])['quantidade'].sum().reset_index()
+    def plot_distribuicao_municipios(cubo, ano):
+        # Quantidade por município e tipo no ano selecionado
+        df_municipios = cubo.distribuicao_municipios(ano)
         
         # Criar gráfico de barras empilhadas
         fig = go.Figure()
@@ -130,28 +117,102 @@ def mostrar_dados_rebanhos():
         
         return fig
 
+    def plot_mapa_municipios(mapa, ano, tipo):
+        # Centroides já convertidos em floats; só o vetor de valores muda com ano/tipo
+        # (não há geometria dos polígonos, então o mapa é de bolhas sobre os centroides)
+        centroides = mapa.centroides
+        valores = mapa.vetor(ano, tipo)
+        presentes = ~np.isnan(valores)
+        maximo = np.nanmax(valores) if presentes.any() else 0
+        tamanhos = 6 + 34 * np.sqrt(valores[presentes] / maximo) if maximo > 0 else 6
+
+        fig = go.Figure(go.Scattermapbox(
+            lat=centroides['latitude'].to_numpy()[presentes],
+            lon=centroides['longitude'].to_numpy()[presentes],
+            text=[f'{nome}: {valor:,.0f}' for nome, valor in
+                  zip(centroides['nome'].to_numpy()[presentes], valores[presentes])],
+            hoverinfo='text',
+            mode='markers',
+            marker=dict(
+                size=tamanhos,
+                color=valores[presentes],
+                colorscale='YlOrRd',
+                showscale=True,
+                colorbar=dict(title='Cabeças'),
+                sizemode='diameter'
+            )
+        ))
+        fig.update_layout(
+            title=f'{tipo} por Município em {ano}',
+            mapbox=dict(
+                style='open-street-map',
+                center=dict(lat=float(centroides['latitude'].mean()),
+                            lon=float(centroides['longitude'].mean())),
+                zoom=5
+            ),
+            height=600,
+            margin=dict(l=0, r=0, t=40, b=0)
+        )
+        return fig
+
     # Carregar dados
-    df = carregar_dados_rebanho()
+    cubo = carregar_cubo_rebanho()
 
-    if df is not None:
-        # Mostrar gráficos
-        st.plotly_chart(plot_evolucao_rebanho(df), use_container_width=True)
-        
-        # Usar o ano mais recente para análises detalhadas
-        ano_selecionado = df['ano'].max()
-        
-        st.plotly_chart(plot_composicao_rebanho(df, ano_selecionado), use_container_width=True)
-        st.plotly_chart(plot_taxa_crescimento(df), use_container_width=True)
-        
-        st.plotly_chart(plot_distribuicao_municipios(df, ano_selecionado), use_container_width=True)
+    if cubo is not None:
+        # Seleção do intervalo de anos (séries históricas) e do ano (análises detalhadas)
+        col_intervalo, col_ano = st.columns(2)
+        with col_intervalo:
+            ano_inicio, ano_fim = st.select_slider(
+                'Intervalo de anos',
+                options=cubo.anos,
+                value=(cubo.anos[0], cubo.anos[-1])
+            )
+        with col_ano:
+            # Por padrão, o ano mais recente
+            ano_selecionado = st.select_slider(
+                'Ano para análise detalhada',
+                options=cubo.anos,
+                value=cubo.anos[-1]
+            )
+
+        # Mostrar gráficos (figuras reaproveitadas enquanto filtros e dados não mudam)
+        fig_evolucao = figura_em_cache(
+            'rebanho_evolucao', FONTES_REBANHO,
+            lambda: plot_evolucao_rebanho(cubo, ano_inicio, ano_fim),
+            uf=uf, ano_inicio=ano_inicio, ano_fim=ano_fim)
+        st.plotly_chart(fig_evolucao, use_container_width=True)
+        
+        fig_composicao = figura_em_cache(
+            'rebanho_composicao', FONTES_REBANHO,
+            lambda: plot_composicao_rebanho(cubo, ano_selecionado),
+            uf=uf, ano=ano_selecionado)
+        st.plotly_chart(fig_composicao, use_container_width=True)
+        fig_crescimento = figura_em_cache(
+            'rebanho_crescimento', FONTES_REBANHO,
+            lambda: plot_taxa_crescimento(cubo, ano_inicio, ano_fim),
+            uf=uf, ano_inicio=ano_inicio, ano_fim=ano_fim)
+        st.plotly_chart(fig_crescimento, use_container_width=True)
+        
+        fig_municipios = figura_em_cache(
+            'rebanho_municipios', FONTES_REBANHO,
+            lambda: plot_distribuicao_municipios(cubo, ano_selecionado),
+            uf=uf, ano=ano_selecionado)
+        st.plotly_chart(fig_municipios, use_container_width=True)
+
+        # Distribuição espacial por município (centroides do diretório de municípios)
+        st.subheader('Distribuição Espacial por Município')
+        mapa = obter_mapa_rebanho(uf)
+        tipo_mapa = st.selectbox('Tipo de rebanho', mapa.tipos)
+        if ano_selecionado in mapa.anos:
+            fig_mapa = figura_em_cache(
+                'rebanho_mapa_municipios', FONTES_REBANHO,
+                lambda: plot_mapa_municipios(mapa, ano_selecionado, tipo_mapa),
+                uf=uf, ano=ano_selecionado, tipo=tipo_mapa)
+            st.plotly_chart(fig_mapa, use_container_width=True)
         
         # Adicionar estatísticas descritivas
         st.subheader('Estatísticas Descritivas')
-        df_stats = df[df['ano'] == ano_selecionado].groupby('tipo_rebanho').agg({
-            'quantidade': ['sum', 'mean', 'std', 'min', 'max']
-        }).round(2)
-        df_stats.columns = ['Total', 'Média por Município', 'Desvio Padrão', 'Mínimo', 'Máximo']
-        st.dataframe(df_stats)
+        st.dataframe(cubo.estatisticas_ano(ano_selecionado))
 
 # Execute a função se este arquivo for executado diretamente
 if __name__ == "__main__":
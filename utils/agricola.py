@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import (
+    ARQUIVO_AGRICOLAS,
+    PRODUTOS_DESEJADOS,
+    carregar_tabela,
+    em_cache,
+)
+
+
+class CuboAgricola:
+    """Produção em um array denso produto × UF × ano, montado uma única vez.
+
+    Selecionar estados, produtos ou um intervalo de anos é apenas um recorte
+    do array (sem groupby nem pivot por interação). Células sem dado são NaN.
+    """
+
+    def __init__(self, df):
+        self.produtos = sorted(df['produto'].unique().tolist())
+        self.ufs = sorted(df['uf'].unique().tolist())
+        self.anos = [int(a) for a in np.unique(df['ano'])]
+
+        i_produto = np.searchsorted(self.produtos, df['produto'].astype(str).to_numpy())
+        i_uf = np.searchsorted(self.ufs, df['uf'].astype(str).to_numpy())
+        i_ano = np.searchsorted(self.anos, df['ano'].to_numpy())
+        self.valores = np.full((len(self.produtos), len(self.ufs), len(self.anos)), np.nan)
+        self.valores[i_produto, i_uf, i_ano] = df['quantidade'].to_numpy()
+
+    def _indices_anos(self, inicio=None, fim=None):
+        inicio = self.anos[0] if inicio is None else inicio
+        fim = self.anos[-1] if fim is None else fim
+        return (int(np.searchsorted(self.anos, inicio, side='left')),
+                int(np.searchsorted(self.anos, fim, side='right')))
+
+    def fatia(self, produtos, ufs, inicio=None, fim=None):
+        """Array produtos × ufs × anos do recorte pedido (na ordem pedida)"""
+        ip = [self.produtos.index(p) for p in produtos]
+        iu = [self.ufs.index(u) for u in ufs]
+        ini, fim = self._indices_anos(inicio, fim)
+        return self.valores[np.ix_(ip, iu, np.arange(ini, fim))]
+
+    def anos_intervalo(self, inicio=None, fim=None):
+        ini, fim = self._indices_anos(inicio, fim)
+        return self.anos[ini:fim]
+
+    def tabela(self, produtos, ufs, inicio=None, fim=None):
+        """Recorte em formato largo: índice Ano, uma coluna por (produto, UF)"""
+        recorte = self.fatia(produtos, ufs, inicio, fim)
+        colunas = pd.MultiIndex.from_product([produtos, ufs], names=['produto', 'uf'])
+        return pd.DataFrame(recorte.reshape(-1, recorte.shape[2]).T,
+                            index=pd.Index(self.anos_intervalo(inicio, fim), name='Ano'),
+                            columns=colunas)
+
+    def produtos_padrao(self):
+        """Produtos da planilha que correspondem à lista padrão do painel"""
+        return [p for p in self.produtos
+                if any(desejado.lower() in p.lower() for desejado in PRODUTOS_DESEJADOS)]
+
+
+def obter_cubo_agricola():
+    """Cubo da planilha inteira, reconstruído apenas quando o arquivo muda"""
+    return em_cache('cubo_agricola', [ARQUIVO_AGRICOLAS],
+                    lambda: CuboAgricola(carregar_tabela('agricolas')))
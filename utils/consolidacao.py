@@ -0,0 +1,177 @@
+"""Junção dos dados de rebanho, agrícolas e meteorológicos em uma única tabela.
+
+Módulo de biblioteca, sem efeitos colaterais do Streamlit: pode ser importado
+por qualquer página sem executar o painel consolidado (`app_completo.py`).
+"""
+import pandas as pd
+
+from utils.data_processing import (
+    ARQUIVO_AGRICOLAS,
+    ARQUIVO_REBANHOS,
+    COLUNAS_METEO_NORMALIZADAS,
+    carregar_agricolas,
+    carregar_meteorologicos,
+    carregar_rebanhos,
+    em_cache,
+    listar_arquivos_meteo,
+)
+from utils.rebanhos import obter_vocabulario_rebanho
+
+# --- Grupos de variáveis por origem ---
+# Ajuste os padrões conforme necessário para seus dados reais
+PADROES_AGRICOLAS = ['soja', 'algodão', 'café', 'laranja', 'cana', 'grão', 'milho', 'madeira', 'algodao']
+PADROES_METEO = ['precip', 'chuva', 'temp', 'umid', 'vento', 'rad', 'evapo', 'meteo', 'clima']
+PADROES_REBANHO = ['bovino', 'gado', 'rebanho', 'vaca', 'boi', 'animal', 'suino', 'caprino', 'ovino', 'equino']
+
+# Nomes das colunas meteorológicas na tabela consolidada (os de `carregar_meteorologicos`)
+COLUNAS_METEO_NORM = [nome for curta, nome in COLUNAS_METEO_NORMALIZADAS.items() if curta != 'Data']
+
+
+def padronizar_colunas(df):
+    """Padroniza nomes de colunas para facilitar o merge (retorna uma cópia)"""
+    return df.rename(columns=lambda c: str(c).strip().lower().replace(" ", "_"))
+
+
+# Grãos das fontes consolidadas: colunas-chave de cada nível de agregação
+GRAOS = {
+    'ano': ['ano'],
+    'ano_municipio': ['ano', 'id_municipio'],
+}
+
+# Chaves de junção convertidas para inteiros antes de agregar/unir
+CHAVES_INTEIRAS = {'ano': 'int16', 'id_municipio': 'int32'}
+
+
+def memoria_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def chaves_inteiras(df, chaves):
+    """Converte as chaves inteiras (ano, id_municipio) para int, descartando linhas sem chave"""
+    conversao = {c: CHAVES_INTEIRAS[c] for c in chaves if c in CHAVES_INTEIRAS}
+    if not conversao:
+        return df
+    numericas = {c: pd.to_numeric(df[c], errors='coerce') for c in conversao}
+    validas = pd.concat(numericas, axis=1).notna().all(axis=1)
+    return df.assign(**numericas)[validas].astype(conversao)
+
+
+def agregar_grao(df, grao, medidas=None, agregacao='sum', dimensoes=()):
+    """Agrega uma fonte ao grão declarado (`GRAOS`) mais dimensões extras (ex.: tipo_rebanho).
+
+    Resultado: uma linha por combinação de chaves, com chaves inteiras e
+    apenas as `medidas` (por padrão, todas as colunas numéricas restantes).
+    """
+    chaves = GRAOS[grao] + list(dimensoes)
+    df = chaves_inteiras(df, chaves)
+    if medidas is None:
+        medidas = [c for c in df.columns if c not in chaves and pd.api.types.is_numeric_dtype(df[c])]
+    return df.groupby(chaves, observed=True)[medidas].agg(agregacao).reset_index()
+
+
+def juntar(esquerda, direita, chaves, como='outer', etapa=None, relatorio=None):
+    """Une duas tabelas já agregadas pelas chaves inteiras declaradas.
+
+    A direita precisa ser única nas chaves (junção muitos-para-um); com
+    `relatorio` (lista), registra linhas e memória antes e depois da junção.
+    """
+    esquerda = chaves_inteiras(esquerda, chaves)
+    direita = chaves_inteiras(direita, chaves)
+    resultado = pd.merge(esquerda, direita, on=chaves, how=como, validate='many_to_one')
+    if relatorio is not None:
+        relatorio.append({
+            'etapa': etapa or ' + '.join(chaves),
+            'linhas_esquerda': len(esquerda),
+            'linhas_direita': len(direita),
+            'linhas_resultado': len(resultado),
+            'memoria_antes_mb': round(memoria_mb(esquerda) + memoria_mb(direita), 3),
+            'memoria_depois_mb': round(memoria_mb(resultado), 3),
+        })
+    return resultado
+
+
+def classificar_variavel(nome):
+    nome_l = nome.lower()
+    if any(p in nome_l for p in PADROES_AGRICOLAS):
+        return 'Agrícolas'
+    if any(p in nome_l for p in PADROES_METEO):
+        return 'Meteorológicas'
+    if any(p in nome_l for p in PADROES_REBANHO):
+        return 'Rebanho'
+    return 'Outras'
+
+
+def identificar_coluna_tempo(df):
+    for c in ['ano', 'data', 'ano_referencia', 'ano_base']:
+        if c in df.columns:
+            return c
+    return None
+
+
+def identificar_coluna_tipo_rebanho(df):
+    for c in df.columns:
+        if c.lower() == 'tipo_rebanho':
+            return c
+    return None
+
+
+def listar_tipos_rebanho(df, coluna='tipo_rebanho'):
+    """Tipos de rebanho presentes na tabela (rótulos reais das categorias)"""
+    return list(df[coluna].cat.remove_unused_categories().cat.categories)
+
+
+def filtrar_tipos_rebanho(df, tipos, coluna='tipo_rebanho'):
+    """Linhas dos tipos pedidos (rótulos ou apelidos), casados pelos códigos canônicos"""
+    return df[obter_vocabulario_rebanho().mascara(df[coluna], tipos)]
+
+
+def carregar_consolidacao():
+    """Tabela consolidada e o relatório das junções (linhas e memória por etapa).
+
+    Cada fonte é agregada ao seu grão antes da junção: rebanhos por ano e tipo
+    (total da UF), agrícolas e meteorológicos por ano. As junções usam a
+    chave inteira `ano`, então as colunas anuais não se repetem por município.
+    """
+    def _carregar():
+        relatorio = []
+        df_rebanhos = carregar_rebanhos('MS', colunas=['ano', 'tipo_rebanho', 'quantidade'])
+        relatorio.append({'etapa': 'rebanhos (bruto)', 'linhas_resultado': len(df_rebanhos),
+                          'memoria_depois_mb': round(memoria_mb(df_rebanhos), 3)})
+        df_rebanhos = agregar_grao(df_rebanhos, 'ano', ['quantidade'], 'sum', dimensoes=['tipo_rebanho'])
+        relatorio.append({'etapa': 'rebanhos (ano × tipo)', 'linhas_resultado': len(df_rebanhos),
+                          'memoria_depois_mb': round(memoria_mb(df_rebanhos), 3)})
+
+        df_agricolas = agregar_grao(padronizar_colunas(carregar_agricolas()), 'ano', agregacao='mean')
+        df_merged = juntar(df_rebanhos, df_agricolas, GRAOS['ano'], etapa='+ agrícolas (ano)',
+                           relatorio=relatorio)
+
+        df_meteo = carregar_meteorologicos()
+        if df_meteo is not None:
+            df_meteo = agregar_grao(padronizar_colunas(df_meteo), 'ano', agregacao='mean')
+            df_merged = juntar(df_merged, df_meteo, GRAOS['ano'], etapa='+ meteorológicos (ano)',
+                               relatorio=relatorio)
+
+        # Garante que as colunas estejam em minúsculo
+        df_merged.columns = [str(c).lower() for c in df_merged.columns]
+        return df_merged.sort_values(['ano', 'tipo_rebanho']).reset_index(drop=True), pd.DataFrame(relatorio)
+
+    fontes = [ARQUIVO_REBANHOS, ARQUIVO_AGRICOLAS] + listar_arquivos_meteo()
+    return em_cache('consolidado', fontes, _carregar)
+
+
+def carregar_dados_consolidados():
+    """Rebanhos, agrícolas e meteorológicos unidos em um único DataFrame"""
+    return carregar_consolidacao()[0]
+
+
+def listar_variaveis(df, col_tempo):
+    """Variáveis meteorológicas e agrícolas (apenas numéricas) disponíveis para seleção"""
+    variaveis_meteo = [col for col in COLUNAS_METEO_NORM if col in df.columns]
+    variaveis_agricolas = [
+        col for col in df.columns
+        if col != col_tempo
+        and col.lower() not in ['quantidade', 'sigla_uf', 'tipo_rebanho']
+        and pd.api.types.is_numeric_dtype(df[col])
+        and classificar_variavel(col) == 'Agrícolas'
+    ]
+    return variaveis_meteo, variaveis_agricolas
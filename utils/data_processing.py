@@ -1,26 +1,589 @@
+import glob
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
+from utils import snapshot
+
+# Raiz do projeto (um nível acima de utils/), para não depender do diretório corrente
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+ARQUIVO_REBANHOS = os.path.join(DATA_DIR, "dados_rebanho", "br_ibge_ppm_efetivo_rebanhos.csv")
+ARQUIVO_MUNICIPIOS = os.path.join(DATA_DIR, "dados_rebanho", "br_bd_diretorios_brasil_municipio.csv")
+ARQUIVO_AGRICOLAS = os.path.join(DATA_DIR, "dados_agricolas", "producao_qtde_produzida.xlsx")
+PASTA_METEO = os.path.join(DATA_DIR, "dados_meteorologicos")
+
+PRODUTOS_DESEJADOS = ['Soja', 'Algodão', 'Café', 'Laranja', 'Cana de açúcar', 'Grãos', 'Madeira para papel', 'Milho']
+
+# Limite de memória do cache compartilhado (em MB), configurável por variável de ambiente
+CACHE_MAX_MB = float(os.environ.get("CARBON_CACHE_MB", "512"))
+
+
+def tamanho_objeto(valor, vistos=None):
+    """Estima o tamanho em bytes de um objeto guardado no cache
+
+    Objetos já contados (referências repetidas ou ciclos) entram uma única vez.
+    """
+    if vistos is None:
+        vistos = set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if isinstance(valor, pd.DataFrame) else int(uso)
+    if isinstance(valor, dict):
+        return sum(tamanho_objeto(v, vistos) for v in valor.values()) + sys.getsizeof(valor)
+    if isinstance(valor, (list, tuple)):
+        return sum(tamanho_objeto(v, vistos) for v in valor) + sys.getsizeof(valor)
+    if hasattr(valor, 'nbytes'):
+        # Arrays do NumPy e objetos que informam o próprio tamanho
+        return int(valor.nbytes)
+    if hasattr(valor, '__dict__'):
+        # Objetos de agregados (cubos, índices): soma dos atributos
+        return tamanho_objeto(vars(valor), vistos)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Cache LRU de processo, limitado por memória e seguro entre threads.
+
+    O Streamlit executa cada sessão em uma thread do mesmo processo, então um
+    único cache em nível de módulo é compartilhado por todos os usuários.
+    Enquanto uma chave está sendo carregada, as demais threads que pedem a
+    mesma chave esperam pelo resultado em vez de carregar o arquivo de novo.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._carregando = {}
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, carregar):
+        while True:
+            with self._lock:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return self._itens[chave][0]
+                evento = self._carregando.get(chave)
+                if evento is None:
+                    evento = threading.Event()
+                    self._carregando[chave] = evento
+                    self.faltas += 1
+                    break
+            # Outra thread já está carregando esta chave
+            evento.wait()
+
+        try:
+            valor = carregar()
+            self.guardar(chave, valor)
+            return valor
+        finally:
+            with self._lock:
+                self._carregando.pop(chave, None)
+            evento.set()
+
+    def guardar(self, chave, valor):
+        tamanho = tamanho_objeto(valor)
+        with self._lock:
+            if chave in self._itens:
+                del self._itens[chave]
+            if tamanho > self.max_bytes:
+                # Objeto maior que o orçamento inteiro: não guarda
+                return
+            self._itens[chave] = (valor, tamanho)
+            self._evictar()
+
+    def _evictar(self):
+        total = sum(t for _, t in self._itens.values())
+        while total > self.max_bytes and self._itens:
+            _, (_, tamanho) = self._itens.popitem(last=False)
+            total -= tamanho
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'itens': len(self._itens),
+                'bytes': sum(t for _, t in self._itens.values()),
+                'max_bytes': self.max_bytes,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+            }
+
+
+_cache = CacheLRU(int(CACHE_MAX_MB * 1024 * 1024))
+
+
+def assinatura_arquivo(caminho):
+    """Identifica a versão de um arquivo pelo caminho absoluto, mtime e tamanho"""
+    caminho = os.path.abspath(caminho)
+    st = os.stat(caminho)
+    return (caminho, st.st_mtime_ns, st.st_size)
+
+
+def _congelar(valor):
+    """Converte opções de leitura em uma estrutura imutável para compor a chave do cache"""
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple, set)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def em_cache(nome, caminhos, carregar, **opcoes):
+    """Retorna o resultado de `carregar()` a partir do cache compartilhado.
+
+    A chave combina o nome do carregador, a assinatura (caminho + mtime) de cada
+    arquivo de origem e as opções de leitura, de modo que qualquer alteração nos
+    arquivos invalida a entrada automaticamente. Os objetos retornados são
+    compartilhados entre sessões e não devem ser modificados in-place.
+    """
+    chave = (nome, tuple(assinatura_arquivo(c) for c in caminhos), _congelar(opcoes))
+    return _cache.obter(chave, carregar)
+
+
+def estatisticas_cache():
+    return _cache.estatisticas()
+
+
+# ---------------------------------------------------------------------------
+# Tabelas normalizadas (snapshot Arrow com fallback para os arquivos brutos)
+# ---------------------------------------------------------------------------
+
+# Colunas de medição das estações do INMET (nomes originais do cabeçalho)
+COLUNAS_INMET = [
+    'NUMERO DE DIAS COM PRECIP. PLUV, MENSAL (AUT)(número)',
+    'PRECIPITACAO TOTAL, MENSAL (AUT)(mm)',
+    'PRESSAO ATMOSFERICA, MEDIA MENSAL (AUT)(mB)',
+    'TEMPERATURA MEDIA, MENSAL (AUT)(°C)',
+    'VENTO, VELOCIDADE MAXIMA MENSAL (AUT)(m/s)',
+    'VENTO, VELOCIDADE MEDIA MENSAL (AUT)(m/s)'
+]
+
+
+# Tamanho do bloco (linhas) na leitura em partes dos CSVs grandes
+TAMANHO_BLOCO_CSV = 200_000
+
+DTYPES_REBANHOS = {'ano': 'int16', 'sigla_uf': 'category', 'id_municipio': 'int32',
+                   'tipo_rebanho': 'category', 'quantidade': 'int64'}
+DTYPES_MUNICIPIOS = {'id_municipio': 'int32', 'sigla_uf': 'category', 'nome_uf': 'category',
+                     'nome_regiao': 'category'}
+
+
+def _filtros_normalizados(filtros):
+    """{coluna: valor ou lista de valores} -> {coluna: tupla de valores}"""
+    if not filtros:
+        return {}
+    return {col: tuple(v) if isinstance(v, (list, tuple, set)) else (v,) for col, v in filtros.items()}
+
+
+def _aplicar_filtros(df, colunas=None, filtros=None):
+    for col, valores in _filtros_normalizados(filtros).items():
+        df = df[df[col].isin(valores)]
+    if colunas is not None:
+        df = df[list(colunas)]
+    return df.reset_index(drop=True)
+
+
+def ler_csv_filtrado(caminho, colunas=None, filtros=None, dtype=None, tamanho_bloco=TAMANHO_BLOCO_CSV, **opcoes):
+    """Lê um CSV em blocos, mantendo só as colunas pedidas e as linhas que passam nos filtros.
+
+    O pico de memória fica limitado ao tamanho do bloco mais as linhas
+    selecionadas, o que permite usar arquivos nacionais para uma única UF.
+    """
+    filtros = _filtros_normalizados(filtros)
+    usecols = None if colunas is None else list(dict.fromkeys(list(colunas) + list(filtros)))
+    dtype = dict(dtype or {})
+    # Categorias são aplicadas no final: blocos com categorias diferentes viram object no concat
+    categoricas = [c for c, t in dtype.items() if t == 'category' and (usecols is None or c in usecols)]
+    dtype_bloco = {c: t for c, t in dtype.items()
+                   if (usecols is None or c in usecols) and c not in categoricas}
+    dtype_bloco.update({c: 'object' for c in categoricas})
+
+    partes = []
+    for bloco in pd.read_csv(caminho, usecols=usecols, dtype=dtype_bloco, chunksize=tamanho_bloco, **opcoes):
+        for col, valores in filtros.items():
+            bloco = bloco[bloco[col].isin(valores)]
+        partes.append(bloco)
+    df = pd.concat(partes, ignore_index=True)
+    if categoricas:
+        df = df.astype({c: 'category' for c in categoricas})
+    if colunas is not None:
+        df = df[list(colunas)]
+    return df
+
+
+def valores_distintos_csv(caminho, coluna, dtype=None, tamanho_bloco=TAMANHO_BLOCO_CSV, **opcoes):
+    """Valores distintos (ordenados) de uma coluna de um CSV, acumulados bloco a bloco"""
+    valores = set()
+    for bloco in pd.read_csv(caminho, usecols=[coluna], dtype=dtype, chunksize=tamanho_bloco, **opcoes):
+        valores.update(bloco[coluna].dropna().unique())
+    return sorted(valores)
+
+
+def _normalizar_rebanhos(colunas=None, filtros=None):
+    return ler_csv_filtrado(ARQUIVO_REBANHOS, colunas, filtros, dtype=DTYPES_REBANHOS, sep=';')
+
+
+# Blocos agregados acumulados por UF antes de uma compactação (groupby dos parciais)
+PARCIAIS_POR_COMPACTACAO = 8
+
+
+def agregar_rebanhos_por_uf(caminho=ARQUIVO_REBANHOS, tamanho_bloco=TAMANHO_BLOCO_CSV):
+    """Lê o efetivo dos rebanhos em blocos e agrega em (ano, município, tipo) por UF.
+
+    Cada bloco é somado por UF/ano/município/tipo assim que é lido e os
+    parciais de cada UF são compactados periodicamente, então o pico de
+    memória depende do tamanho do bloco e do cubo agregado (municípios × anos
+    × tipos), não do número de linhas do arquivo. Gera pares (UF, DataFrame)
+    com as colunas de `carregar_rebanhos`, um por UF.
+    """
+    chaves = ['ano', 'id_municipio', 'tipo_rebanho']
+    dtype = {c: t for c, t in DTYPES_REBANHOS.items() if t != 'category'}
+    parciais = {}
+    for bloco in pd.read_csv(caminho, sep=';', usecols=list(DTYPES_REBANHOS), dtype=dtype,
+                             chunksize=tamanho_bloco):
+        for uf, parte in bloco.groupby('sigla_uf', sort=False):
+            lista = parciais.setdefault(uf, [])
+            lista.append(parte.groupby(chaves, sort=False)['quantidade'].sum())
+            if len(lista) >= PARCIAIS_POR_COMPACTACAO:
+                parciais[uf] = [pd.concat(lista).groupby(level=chaves, sort=False).sum()]
+
+    for uf in sorted(parciais):
+        agregado = pd.concat(parciais.pop(uf)).groupby(level=chaves).sum().reset_index()
+        agregado.insert(1, 'sigla_uf', uf)
+        yield uf, agregado[list(DTYPES_REBANHOS)].astype(DTYPES_REBANHOS)
+
+
+def _normalizar_municipios(colunas=None, filtros=None):
+    return ler_csv_filtrado(ARQUIVO_MUNICIPIOS, colunas, filtros, dtype=DTYPES_MUNICIPIOS)
+
+
+def _codigo_estacao(caminho):
+    """Código da estação (ex.: A702) a partir do nome do arquivo do INMET"""
+    return os.path.basename(caminho).split('_')[1]
+
+
+# Linhas do bloco de cabeçalho dos arquivos do INMET (antes da linha de títulos)
+LINHAS_CABECALHO_INMET = 10
+
+
+def ler_arquivo_inmet(caminho, offset_dados=None):
+    """Série mensal de um arquivo de estação do INMET, lida em uma única passada.
+
+    O parser C do pandas já converte a vírgula decimal, trata 'null' como NaN,
+    lê as medições direto em float32 e a data como datetime; a coluna vazia
+    criada pelo ';' no fim de cada linha é descartada por `usecols`.
+    Com `offset_dados` (posição em bytes da seção CSV, ver utils.meteo), a
+    leitura começa direto nos dados, sem percorrer o cabeçalho.
+    """
+    opcoes = dict(
+        sep=';',
+        decimal=',',
+        na_values=['null'],
+        keep_default_na=False,
+        usecols=['Data Medicao'] + COLUNAS_INMET,
+        dtype={c: 'float32' for c in COLUNAS_INMET},
+        parse_dates=['Data Medicao'],
+        encoding='utf-8',
+    )
+    if offset_dados is None:
+        return pd.read_csv(caminho, skiprows=LINHAS_CABECALHO_INMET, **opcoes)
+    with open(caminho, 'rb') as f:
+        f.seek(offset_dados)
+        return pd.read_csv(f, **opcoes)
+
+
+def _normalizar_meteorologicos(colunas=None, filtros=None):
+    dfs = []
+    for arq in listar_arquivos_meteo():
+        df = ler_arquivo_inmet(arq)
+        df.insert(0, 'codigo_estacao', _codigo_estacao(arq))
+        dfs.append(df)
+    df = pd.concat(dfs, ignore_index=True)
+    df['codigo_estacao'] = df['codigo_estacao'].astype('category')
+    return _aplicar_filtros(df, colunas, filtros)
+
+
+def _numero(valor):
+    """Valor de célula da planilha -> float (aceita vírgula decimal; vazio/texto -> NaN)"""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    try:
+        return float(str(valor).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def ler_planilha_agricola(caminho=ARQUIVO_AGRICOLAS, ufs=None):
+    """Lê a planilha agrícola em uma única passada, no modo somente leitura do openpyxl.
+
+    As duas primeiras linhas trazem o produto e a UF de cada coluna; das
+    linhas seguintes (uma por ano) são guardadas apenas as células das colunas
+    com produto e UF definidos (e das `ufs` pedidas, se informadas). Retorna
+    a tabela longa (produto, uf, ano, quantidade). A quantidade fica em float64:
+    em float32, cerca de um em cada nove valores da planilha mudaria (até dezenas
+    de toneladas) para economizar poucos KB.
+    """
+    from openpyxl import load_workbook
+
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        cab_produtos = next(linhas, ())[1:]
+        cab_ufs = next(linhas, ())[1:]
+        colunas = [
+            i for i, (produto, uf) in enumerate(zip(cab_produtos, cab_ufs), start=1)
+            if produto is not None and uf is not None and (ufs is None or uf in ufs)
+        ]
+        anos, valores = [], []
+        for linha in linhas:
+            ano = _numero(linha[0]) if linha else float('nan')
+            if ano != ano:
+                continue
+            anos.append(int(ano))
+            valores.append([_numero(linha[i]) if i < len(linha) else float('nan') for i in colunas])
+    finally:
+        livro.close()
+
+    matriz = np.array(valores, dtype='float64').reshape(len(anos), len(colunas))
+    df_longo = pd.DataFrame({
+        'produto': pd.Categorical(np.repeat([str(cab_produtos[i - 1]) for i in colunas], len(anos))),
+        'uf': pd.Categorical(np.repeat([str(cab_ufs[i - 1]) for i in colunas], len(anos))),
+        'ano': np.tile(np.array(anos, dtype='int16'), len(colunas)),
+        'quantidade': matriz.T.ravel(),
+    })
+    return df_longo[df_longo['quantidade'].notna()].reset_index(drop=True)
+
+
+def _normalizar_agricolas(colunas=None, filtros=None):
+    """Planilha agrícola em formato longo: (produto, uf, ano, quantidade)"""
+    ufs = _filtros_normalizados(filtros).get('uf')
+    return _aplicar_filtros(ler_planilha_agricola(ufs=ufs), colunas, filtros)
+
+
+# nome da tabela -> (função que lista os arquivos de origem, função de normalização)
+TABELAS = {
+    'rebanhos': (lambda: [ARQUIVO_REBANHOS], _normalizar_rebanhos),
+    'municipios': (lambda: [ARQUIVO_MUNICIPIOS], _normalizar_municipios),
+    'meteorologicos': (lambda: listar_arquivos_meteo(), _normalizar_meteorologicos),
+    'agricolas': (lambda: [ARQUIVO_AGRICOLAS], _normalizar_agricolas),
+}
+
+
+# Tabelas gravadas no snapshot em partições: nome -> (coluna de partição, ingestão em blocos)
+PARTICOES = {
+    'rebanhos': ('sigla_uf', agregar_rebanhos_por_uf),
+}
+
+
+def fontes_tabela(nome):
+    return TABELAS[nome][0]()
+
+
+def _snapshot_em_dia(nome, fontes):
+    if not snapshot.disponivel() or not os.path.exists(snapshot.MANIFESTO):
+        return None
+    # A verificação (que pode exigir hash) só é refeita quando fontes ou manifesto mudam
+    return em_cache('snapshot_valido', fontes + [snapshot.MANIFESTO],
+                    lambda: snapshot.snapshot_valido(nome, fontes), tabela=nome)
+
+
+def carregar_tabela(nome, colunas=None, filtros=None):
+    """Tabela normalizada e tipada, lida do snapshot Arrow quando ele está em dia.
+
+    `colunas` limita as colunas lidas e `filtros` ({coluna: valor ou lista})
+    seleciona linhas antes da conversão para pandas (no snapshot, o filtro é
+    aplicado na tabela Arrow; nos CSVs, bloco a bloco durante a leitura).
+    Se o snapshot não existir ou o manifesto indicar que as fontes mudaram,
+    a tabela é normalizada a partir dos arquivos brutos (ver `ingest_data.py`).
+    """
+    fontes = fontes_tabela(nome)
+    colunas = None if colunas is None else tuple(colunas)
+    filtros = _filtros_normalizados(filtros)
+    caminho = _snapshot_em_dia(nome, fontes)
+    if caminho and os.path.isdir(caminho):
+        # Snapshot particionado: só as partições pedidas (ex.: a UF) são abertas
+        coluna = PARTICOES[nome][0]
+        valores = filtros.get(coluna)
+        resto = {c: v for c, v in filtros.items() if c != coluna}
+        return em_cache('snapshot', [snapshot.MANIFESTO],
+                        lambda: snapshot.ler_particoes(caminho, valores, colunas, resto),
+                        tabela=nome, colunas=colunas, filtros=filtros)
+    if caminho:
+        return em_cache('snapshot', [caminho], lambda: snapshot.ler_snapshot(caminho, colunas, filtros),
+                        colunas=colunas, filtros=filtros)
+    return em_cache('tabela', fontes, lambda: TABELAS[nome][1](colunas, filtros),
+                    tabela=nome, colunas=colunas, filtros=filtros)
+
+
+# ---------------------------------------------------------------------------
+# Rebanhos
+# ---------------------------------------------------------------------------
+
+def carregar_rebanhos(uf=None, colunas=None):
+    """Efetivo dos rebanhos (ano, sigla_uf, id_municipio, tipo_rebanho, quantidade)
+
+    Com `uf`, apenas as linhas daquela UF são lidas; com `colunas`, apenas
+    essas colunas.
+    """
+    return carregar_tabela('rebanhos', colunas, {'sigla_uf': uf} if uf else None)
+
+
+def valores_rebanhos(coluna):
+    """Valores distintos de uma coluna do efetivo dos rebanhos, sem carregar a coluna inteira.
+
+    No snapshot particionado por UF, as UFs vêm do manifesto; as demais
+    colunas (e o CSV bruto) são percorridas bloco a bloco.
+    """
+    fontes = fontes_tabela('rebanhos')
+    if _snapshot_em_dia('rebanhos', fontes):
+        return em_cache('valores_distintos', [snapshot.MANIFESTO],
+                        lambda: snapshot.valores_distintos('rebanhos', coluna), tabela='rebanhos', coluna=coluna)
+    dtype = {coluna: 'object' if DTYPES_REBANHOS[coluna] == 'category' else DTYPES_REBANHOS[coluna]}
+    return em_cache('valores_distintos', fontes,
+                    lambda: valores_distintos_csv(ARQUIVO_REBANHOS, coluna, dtype, sep=';'),
+                    tabela='rebanhos', coluna=coluna)
+
+
+def listar_ufs_rebanhos():
+    """UFs presentes no efetivo dos rebanhos (partições do snapshot ou blocos do CSV)"""
+    return valores_rebanhos('sigla_uf')
+
+
+def nomes_ufs():
+    """Sigla -> nome de cada UF, a partir do diretório de municípios"""
+    df = carregar_municipios(colunas=['sigla_uf', 'nome_uf']).drop_duplicates('sigla_uf')
+    return dict(zip(df['sigla_uf'].astype(str), df['nome_uf'].astype(str)))
+
+
+def carregar_municipios(uf=None, colunas=None):
+    return carregar_tabela('municipios', colunas, {'sigla_uf': uf} if uf else None)
+
+
+def carregar_dados_rebanho(uf='MS'):
+    """Efetivo dos rebanhos de uma UF com o nome de cada município"""
+    def _carregar():
+        # Lê apenas as linhas da UF e só as colunas usadas no merge
+        df_rebanho = carregar_rebanhos(uf)
+        df_municipios = carregar_municipios(uf, colunas=['id_municipio', 'nome'])
+
+        # Mesclar com dados dos municípios
+        return pd.merge(df_rebanho,
+                        df_municipios[['id_municipio', 'nome']],
+                        on='id_municipio',
+                        how='left')
+    return em_cache('dados_rebanho', [ARQUIVO_REBANHOS, ARQUIVO_MUNICIPIOS], _carregar, uf=uf)
+
+
 def load_rebanho_data():
     try:
-        # Substitua o caminho abaixo pelo caminho correto para o arquivo de dados de rebanho
-        file_path = "data/rebanho_data.csv"
-        
-        # Carregar os dados do arquivo CSV
-        df = pd.read_csv(file_path)
-        
+        df = carregar_rebanhos()
+
         # Verificar se o DataFrame está vazio
         if df.empty:
             raise ValueError("O arquivo de dados de rebanho está vazio.")
-        
+
         return df
     except FileNotFoundError:
-        raise FileNotFoundError(f"Arquivo de dados de rebanho não encontrado: {file_path}")
+        raise FileNotFoundError(f"Arquivo de dados de rebanho não encontrado: {ARQUIVO_REBANHOS}")
     except Exception as e:
         raise RuntimeError(f"Erro ao carregar os dados de rebanho: {e}")
 
+
+# ---------------------------------------------------------------------------
+# Agrícolas
+# ---------------------------------------------------------------------------
+
+def carregar_agricolas(uf='MS', produtos=None):
+    """Produção da UF em formato largo: coluna 'Ano' (texto) e uma coluna por produto"""
+    produtos = PRODUTOS_DESEJADOS if produtos is None else produtos
+
+    def _carregar():
+        df_longo = carregar_tabela('agricolas')
+        nomes = [p for p in df_longo['produto'].cat.categories
+                 if any(prod.lower() in str(p).lower() for prod in produtos)]
+        df_uf = df_longo[(df_longo['uf'] == uf) & df_longo['produto'].isin(nomes)]
+        df_uf = df_uf.pivot_table(index='ano', columns='produto', values='quantidade',
+                                  aggfunc='first', observed=True)
+        # Mantém todos os anos da planilha e a ordem original das colunas
+        anos = sorted(df_longo['ano'].unique())
+        ordem = [p for p in df_longo['produto'].unique() if p in df_uf.columns]
+        df_uf = df_uf.reindex(index=anos, columns=ordem)
+        df_uf.columns = [str(c) for c in df_uf.columns]
+        df_uf.index = df_uf.index.astype(str)
+        return df_uf.rename_axis('Ano').reset_index()
+    return em_cache('agricolas', [ARQUIVO_AGRICOLAS], _carregar, uf=uf, produtos=produtos)
+
+
+# ---------------------------------------------------------------------------
+# Meteorológicos
+# ---------------------------------------------------------------------------
+
+def listar_arquivos_meteo():
+    # Apenas arquivos de estação do INMET (dados_<código>_M_<início>_<fim>.csv); os
+    # consolidados anuais gerados por extract_data.py ficam na mesma pasta. A pasta é
+    # escapada: colchetes no caminho do checkout não podem virar padrão do glob
+    return sorted(glob.glob(os.path.join(glob.escape(PASTA_METEO), 'dados_*_M_*.csv')))
+
+
+# Nomes curtos usados nos gráficos da página meteorológica
+COLUNAS_METEO_CURTAS = {
+    'Data Medicao': 'Data',
+    'NUMERO DE DIAS COM PRECIP. PLUV, MENSAL (AUT)(número)': 'DiasPrecipitacao',
+    'PRECIPITACAO TOTAL, MENSAL (AUT)(mm)': 'PrecipitacaoTotal',
+    'PRESSAO ATMOSFERICA, MEDIA MENSAL (AUT)(mB)': 'PressaoAtmosferica',
+    'TEMPERATURA MEDIA, MENSAL (AUT)(°C)': 'TemperaturaMedia',
+    'VENTO, VELOCIDADE MAXIMA MENSAL (AUT)(m/s)': 'VentoVelocidadeMaxima',
+    'VENTO, VELOCIDADE MEDIA MENSAL (AUT)(m/s)': 'VentoVelocidadeMedia'
+}
+
+
+def normalizar_nome(nome):
+    return nome.strip().lower().replace(" ", "_").replace("ã", "a").replace("ú", "u").replace("Â", "a").replace("Ã", "a").replace("ç", "c").replace(".", "").replace("(", "").replace(")", "")
+
+
+# Nome curto -> nome normalizado das colunas em `carregar_meteorologicos` (e na tabela consolidada)
+COLUNAS_METEO_NORMALIZADAS = {
+    curta: normalizar_nome(original).lower() for original, curta in COLUNAS_METEO_CURTAS.items()
+}
+
+
+def carregar_meteorologicos():
+    """Médias anuais do estado a partir de todas as estações meteorológicas"""
+    arquivos_csv = listar_arquivos_meteo()
+    if not arquivos_csv:
+        return None
+
+    def _carregar():
+        # Import local: utils.meteo depende deste módulo
+        from utils.meteo import obter_base_meteorologica
+
+        # Agrupa por ano e faz média dos valores numéricos para o estado do MS
+        df_estado = obter_base_meteorologica().media_estado('anual').reset_index()
+        # Nomes normalizados a partir dos títulos originais do INMET
+        df_estado = df_estado.rename(columns=COLUNAS_METEO_NORMALIZADAS)
+        df_estado.columns = [str(c).lower() for c in df_estado.columns]
+        return df_estado
+    return em_cache('meteorologicos', arquivos_csv, _carregar)
+
+
 def load_meteorological_data():
-    # Placeholder implementation
-    pass
+    return carregar_meteorologicos()
+
 
 def calculate_statistics():
     # Placeholder implementation
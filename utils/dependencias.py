@@ -0,0 +1,121 @@
+"""Registro das bibliotecas de previsão (statsmodels, Prophet, TensorFlow, scikit-learn).
+
+A disponibilidade de cada biblioteca é descoberta uma única vez, na importação
+deste módulo, com `find_spec` (sem importar nada pesado). Cada biblioteca só é
+importada no primeiro uso e fica guardada; o tempo desse import e o da
+primeira previsão de cada modelo ficam registrados em `tempos()`.
+"""
+import importlib
+import importlib.util
+import threading
+import time
+
+# Biblioteca -> módulo importado no primeiro uso
+BIBLIOTECAS = {
+    'statsmodels': 'statsmodels.tsa.arima.model',
+    'prophet': 'prophet',
+    'tensorflow': 'tensorflow',
+    'sklearn': 'sklearn.ensemble',
+}
+
+# Bibliotecas necessárias para cada modelo da página de análise preditiva
+BIBLIOTECAS_MODELO = {
+    'Regressão Linear': [],
+    'ARIMA/SARIMA': ['statsmodels'],
+    'Prophet': ['prophet'],
+    'LSTM (Deep Learning)': ['tensorflow', 'sklearn'],
+    'Random Forest': ['sklearn'],
+}
+
+
+def _verificar_tensorflow(tf):
+    # Inicialização mínima: acusa instalações quebradas (ex.: DLL no Windows) já no import
+    tf.constant([0.0])
+
+
+# Verificação feita uma única vez logo após o import
+VERIFICACOES = {'tensorflow': _verificar_tensorflow}
+
+# Descoberta feita uma vez por processo: só procura o pacote de topo, sem importá-lo
+DISPONIVEIS = {
+    nome: importlib.util.find_spec(modulo.split('.')[0]) is not None
+    for nome, modulo in BIBLIOTECAS.items()
+}
+
+_lock = threading.Lock()
+_modulos = {}
+_erros = {}
+_tempos_import = {}
+_primeira_previsao = {}
+
+
+def disponivel(nome):
+    return DISPONIVEIS.get(nome, False)
+
+
+def faltantes(modelo):
+    """Bibliotecas do modelo que não estão instaladas"""
+    return [nome for nome in BIBLIOTECAS_MODELO.get(modelo, []) if not disponivel(nome)]
+
+
+def importar(nome):
+    """Módulo da biblioteca, importado (e verificado) apenas na primeira chamada.
+
+    Levanta ImportError se a biblioteca não está instalada ou falhou ao
+    carregar; a falha também fica guardada, sem nova tentativa a cada rerun.
+    """
+    if nome in _modulos:
+        return _modulos[nome]
+    with _lock:
+        if nome in _modulos:
+            return _modulos[nome]
+        if nome in _erros:
+            raise ImportError(_erros[nome])
+        if not disponivel(nome):
+            raise ImportError(f"{nome} não está instalado")
+
+        inicio = time.perf_counter()
+        try:
+            modulo = importlib.import_module(BIBLIOTECAS[nome])
+            if nome in VERIFICACOES:
+                VERIFICACOES[nome](modulo)
+        except Exception as e:
+            _erros[nome] = f"{nome} está instalado, mas não pôde ser carregado: {e}"
+            raise ImportError(_erros[nome]) from e
+        _tempos_import[nome] = time.perf_counter() - inicio
+        _modulos[nome] = modulo
+        return modulo
+
+
+def registrar_previsao(modelo, segundos):
+    """Guarda a duração do primeiro ajuste de cada modelo neste processo"""
+    _primeira_previsao.setdefault(modelo, segundos)
+
+
+def tempos():
+    """Tempos (s) medidos neste processo: import de cada biblioteca e primeira previsão por modelo"""
+    return {'import': dict(_tempos_import), 'primeira_previsao': dict(_primeira_previsao)}
+
+
+def mesclar_tempos(outros):
+    """Incorpora tempos medidos em outro processo (ex.: processos de ajuste em segundo plano)"""
+    for nome, segundos in outros.get('import', {}).items():
+        _tempos_import.setdefault(nome, segundos)
+    for modelo, segundos in outros.get('primeira_previsao', {}).items():
+        _primeira_previsao.setdefault(modelo, segundos)
+
+
+def tabela_tempos():
+    """Uma linha por biblioteca: disponível, tempo de import e primeira previsão dos modelos que a usam"""
+    linhas = []
+    for nome in BIBLIOTECAS:
+        modelos = [m for m, libs in BIBLIOTECAS_MODELO.items() if nome in libs]
+        primeiras = [_primeira_previsao[m] for m in modelos if m in _primeira_previsao]
+        linhas.append({
+            'biblioteca': nome,
+            'disponivel': disponivel(nome),
+            'import_s': _tempos_import.get(nome),
+            'primeira_previsao_s': max(primeiras) if primeiras else None,
+            'modelos': ', '.join(modelos),
+        })
+    return linhas
@@ -0,0 +1,106 @@
+"""Funções auxiliares dos gráficos: cache das figuras e redução de pontos."""
+import os
+
+import numpy as np
+
+from utils.data_processing import CacheLRU, _congelar, assinatura_arquivo
+
+# Orçamento de pontos por figura (somando todas as séries)
+PONTOS_POR_FIGURA = int(os.environ.get("CARBON_PONTOS_FIGURA", "1500"))
+
+# Orçamento de memória (MB) do cache de figuras, separado do cache de dados
+CACHE_FIGURAS_MB = float(os.environ.get("CARBON_CACHE_FIGURAS_MB", "32"))
+
+
+# ---------------------------------------------------------------------------
+# Cache de figuras
+# ---------------------------------------------------------------------------
+
+class FiguraCacheada:
+    """Figura pronta guardada no cache, com o tamanho do JSON serializado.
+
+    Guarda-se o objeto Figure, e não o JSON: o `st.plotly_chart` revalida
+    dicionários campo a campo (bem mais lento que montar a figura de novo),
+    enquanto uma Figure já validada é apenas serializada.
+    """
+
+    def __init__(self, figura):
+        self.figura = figura
+        self.nbytes = len(figura.to_json(validate=False))
+
+
+_cache_figuras = CacheLRU(int(CACHE_FIGURAS_MB * 1024 * 1024))
+
+
+def figura_em_cache(grafico, caminhos, construir, **filtros):
+    """Retorna a figura de `construir()` a partir do cache de figuras.
+
+    A chave combina o identificador do gráfico, a versão (caminho + mtime +
+    tamanho) dos arquivos de origem e os filtros escolhidos na página; uma
+    rerun em que só outro widget mudou reaproveita a figura já montada. As
+    figuras são compartilhadas entre sessões e não devem ser alteradas.
+    """
+    chave = (grafico, tuple(assinatura_arquivo(c) for c in caminhos), _congelar(filtros))
+    return _cache_figuras.obter(chave, lambda: FiguraCacheada(construir())).figura
+
+
+def html_em_cache(grafico, caminhos, construir, **filtros):
+    """Como `figura_em_cache`, para visualizações já renderizadas em HTML (mapas do folium).
+
+    O HTML guardado é sempre o mesmo para a mesma chave, então o navegador não
+    recria o iframe quando outro widget da página muda.
+    """
+    chave = (grafico, tuple(assinatura_arquivo(c) for c in caminhos), _congelar(filtros))
+    return _cache_figuras.obter(chave, construir)
+
+
+def estatisticas_cache_figuras():
+    return _cache_figuras.estatisticas()
+
+
+# ---------------------------------------------------------------------------
+# Redução de pontos
+# ---------------------------------------------------------------------------
+
+
+def lttb(x, y, n_pontos):
+    """Reduz a série (x, y) a `n_pontos` pelo Largest-Triangle-Three-Buckets.
+
+    Mantém o primeiro e o último ponto e, em cada balde intermediário, o ponto
+    que forma o maior triângulo com o ponto escolhido no balde anterior e a
+    média do balde seguinte, preservando picos e vales. `x` deve ser crescente
+    e numérico; retorna os índices escolhidos.
+    """
+    n = len(x)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    limites = np.linspace(1, n - 1, n_pontos - 1).astype(np.int64)
+    escolhidos = np.empty(n_pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+
+    anterior = 0
+    for i in range(n_pontos - 2):
+        ini, fim = limites[i], limites[i + 1]
+        prox_fim = limites[i + 2] if i + 2 < len(limites) else n
+        media_x = x[fim:prox_fim].mean()
+        media_y = y[fim:prox_fim].mean()
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[ini:fim] - y[anterior])
+            - (x[anterior] - x[ini:fim]) * (media_y - y[anterior])
+        )
+        anterior = ini + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def reduzir_serie(datas, valores, n_pontos):
+    """Série temporal com no máximo `n_pontos` pontos (NaN descartados só quando há redução)"""
+    if len(datas) <= n_pontos:
+        return datas, valores
+    validos = ~np.isnan(np.asarray(valores, dtype='float64'))
+    datas, valores = datas[validos], valores[validos]
+    indices = lttb(datas.astype('int64'), valores, n_pontos)
+    return datas[indices], valores[indices]
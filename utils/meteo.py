@@ -0,0 +1,389 @@
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import (
+    BASE_DIR,
+    COLUNAS_METEO_CURTAS,
+    CacheLRU,
+    assinatura_arquivo,
+    carregar_tabela,
+    em_cache,
+    ler_arquivo_inmet,
+    listar_arquivos_meteo,
+)
+from utils.snapshot import SNAPSHOT_DIR
+
+# Catálogo das estações persistido entre execuções (invalidado pelo mtime de cada arquivo)
+ARQUIVO_CATALOGO = os.path.join(SNAPSHOT_DIR, "estacoes.json")
+
+# Orçamento de memória (MB) do cache de séries por estação, separado do cache geral
+CACHE_ESTACOES_MB = float(os.environ.get("CARBON_CACHE_ESTACOES_MB", "64"))
+
+# Chaves do cabeçalho do INMET -> campos do catálogo
+CAMPOS_CABECALHO = {
+    'Nome': 'nome',
+    'Codigo Estacao': 'codigo',
+    'Latitude': 'latitude',
+    'Longitude': 'longitude',
+    'Altitude': 'altitude',
+    'Situacao': 'situacao',
+    'Data Inicial': 'data_inicial',
+    'Data Final': 'data_final',
+    'Periodicidade da Medicao': 'periodicidade',
+}
+CAMPOS_NUMERICOS = ('latitude', 'longitude', 'altitude')
+
+# Variáveis medidas (nomes curtos), na ordem dos arquivos do INMET
+VARIAVEIS_METEO = [c for c in COLUNAS_METEO_CURTAS.values() if c != 'Data']
+
+# Resoluções dos gráficos -> período do pandas ('sazonal' = DJF, MAM, JJA, SON)
+RESOLUCOES = {'mensal': 'M', 'sazonal': 'Q-NOV', 'anual': 'A'}
+
+
+def ler_cabecalho_estacao(caminho):
+    """Lê apenas o bloco de cabeçalho (até a primeira linha em branco) de um arquivo do INMET.
+
+    Retorna os metadados da estação e `offset_dados`, a posição em bytes onde
+    começa a seção CSV (linha de títulos das colunas).
+    """
+    info = {campo: None for campo in CAMPOS_CABECALHO.values()}
+    with open(caminho, 'rb') as f:
+        for linha in iter(f.readline, b''):
+            texto = linha.decode('utf-8').strip()
+            if not texto:
+                break
+            chave, _, valor = texto.partition(':')
+            campo = CAMPOS_CABECALHO.get(chave.strip())
+            if campo:
+                valor = valor.strip()
+                info[campo] = float(valor) if campo in CAMPOS_NUMERICOS and valor else valor
+        info['offset_dados'] = f.tell()
+    return info
+
+
+def _relativo(caminho):
+    return os.path.relpath(os.path.abspath(caminho), BASE_DIR)
+
+
+def _ler_catalogo_persistido():
+    if not os.path.exists(ARQUIVO_CATALOGO):
+        return {}
+    try:
+        with open(ARQUIVO_CATALOGO, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_catalogo(catalogo):
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        temporario = ARQUIVO_CATALOGO + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(catalogo, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, ARQUIVO_CATALOGO)
+    except OSError as e:
+        # Sem permissão de escrita: o catálogo continua valendo em memória
+        warnings.warn(f"Não foi possível gravar o catálogo de estações: {e}")
+
+
+def atualizar_catalogo(arquivos=None):
+    """Catálogo das estações, relendo apenas cabeçalhos de arquivos novos ou alterados"""
+    arquivos = listar_arquivos_meteo() if arquivos is None else arquivos
+    persistido = _ler_catalogo_persistido()
+    catalogo = {}
+    alterado = False
+    for arq in arquivos:
+        chave = _relativo(arq)
+        st = os.stat(arq)
+        entrada = persistido.get(chave)
+        if not entrada or entrada['mtime_ns'] != st.st_mtime_ns or entrada['tamanho'] != st.st_size:
+            entrada = dict(ler_cabecalho_estacao(arq), mtime_ns=st.st_mtime_ns, tamanho=st.st_size)
+            alterado = True
+        catalogo[chave] = entrada
+    if alterado or set(catalogo) != set(persistido):
+        _gravar_catalogo(catalogo)
+    return catalogo
+
+
+def carregar_catalogo_estacoes():
+    """Catálogo das estações como DataFrame (uma linha por arquivo, coluna `arquivo` com o caminho)"""
+    arquivos = listar_arquivos_meteo()
+
+    def _carregar():
+        catalogo = atualizar_catalogo(arquivos)
+        # Colunas explícitas: sem arquivos, o catálogo é apenas vazio
+        colunas = list(CAMPOS_CABECALHO.values()) + ['offset_dados', 'mtime_ns', 'tamanho', 'arquivo']
+        df = pd.DataFrame([dict(entrada, arquivo=os.path.join(BASE_DIR, chave))
+                           for chave, entrada in catalogo.items()], columns=colunas)
+        for coluna in ('data_inicial', 'data_final'):
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+        return df.drop(columns=['mtime_ns', 'tamanho'])
+    return em_cache('catalogo_estacoes', arquivos, _carregar)
+
+
+# ---------------------------------------------------------------------------
+# Séries por estação (carregamento sob demanda com LRU próprio)
+# ---------------------------------------------------------------------------
+
+_cache_estacoes = CacheLRU(int(CACHE_ESTACOES_MB * 1024 * 1024))
+
+
+def _arquivo_estacao(codigo):
+    """(caminho, offset da seção de dados) do arquivo da estação, pelo catálogo"""
+    catalogo = carregar_catalogo_estacoes()
+    linha = catalogo[catalogo['codigo'] == codigo]
+    if linha.empty:
+        raise KeyError(f"Estação não encontrada no catálogo: {codigo}")
+    return linha.iloc[0]['arquivo'], int(linha.iloc[0]['offset_dados'])
+
+
+def carregar_estacao(codigo):
+    """Série mensal de uma estação (colunas de `ler_arquivo_inmet`), lendo apenas o arquivo dela.
+
+    As séries ficam em um LRU próprio, chaveado pelo código da estação e pela
+    versão do arquivo (mtime + tamanho), com orçamento definido por
+    CARBON_CACHE_ESTACOES_MB; a leitura começa direto na seção de dados.
+    O DataFrame é compartilhado entre sessões: não o modifique.
+    """
+    caminho, offset_dados = _arquivo_estacao(codigo)
+    chave = (codigo,) + assinatura_arquivo(caminho)[1:]
+    return _cache_estacoes.obter(chave, lambda: ler_arquivo_inmet(caminho, offset_dados))
+
+
+def estatisticas_cache_estacoes():
+    return _cache_estacoes.estatisticas()
+
+
+# ---------------------------------------------------------------------------
+# Base única de todas as estações (formato longo)
+# ---------------------------------------------------------------------------
+
+class BaseMeteorologica:
+    """Todas as estações em uma única tabela longa: `codigo_estacao`, `Data`,
+    `Mes` e uma coluna float32 por variável, ordenada por (estação, data).
+
+    Os limites de cada estação são achados com `searchsorted` sobre os códigos
+    da categoria, de modo que recortar uma ou várias estações não varre a
+    tabela; consultas entre estações (média do estado, comparação entre
+    cidades) são um único groupby/pivot sobre ela.
+    """
+
+    def __init__(self, df):
+        df = df.rename(columns=COLUNAS_METEO_CURTAS)
+        df['codigo_estacao'] = df['codigo_estacao'].cat.as_ordered().cat.reorder_categories(
+            sorted(df['codigo_estacao'].cat.categories))
+        df = df.sort_values(['codigo_estacao', 'Data'], kind='mergesort').reset_index(drop=True)
+        df.insert(2, 'Mes', df['Data'].dt.month.astype('int8'))
+        self.df = df
+
+        self.estacoes = list(df['codigo_estacao'].cat.categories)
+        codigos = df['codigo_estacao'].cat.codes.to_numpy()
+        self._limites = np.searchsorted(codigos, np.arange(len(self.estacoes) + 1), side='left')
+        self._posicao = {codigo: i for i, codigo in enumerate(self.estacoes)}
+
+    @classmethod
+    def de_estacoes(cls, codigos):
+        """Base apenas com as estações pedidas, montada com as séries do cache por estação"""
+        series = [carregar_estacao(codigo) for codigo in codigos]
+        # concat copia as séries: as do cache não são modificadas
+        df = pd.concat(series, ignore_index=True)
+        df.insert(0, 'codigo_estacao', pd.Categorical(np.repeat(codigos, [len(s) for s in series])))
+        return cls(df)
+
+    def _fatia(self, codigo):
+        i = self._posicao[codigo]
+        return self._limites[i], self._limites[i + 1]
+
+    def estacao(self, codigo):
+        """Série mensal de uma estação"""
+        ini, fim = self._fatia(codigo)
+        return self.df.iloc[ini:fim]
+
+    def selecionar(self, codigos, inicio=None, fim=None):
+        """Linhas das estações pedidas, na ordem em que foram pedidas.
+
+        `inicio`/`fim` limitam as datas (inclusive); como cada estação está
+        ordenada por data, o recorte é feito com `searchsorted` dentro dela.
+        """
+        if not codigos:
+            return self.df.iloc[:0]
+        datas = self.df['Data'].to_numpy()
+        partes = []
+        for codigo in codigos:
+            ini, fim_estacao = self._fatia(codigo)
+            if inicio is not None:
+                ini += int(np.searchsorted(datas[ini:fim_estacao], np.datetime64(inicio), side='left'))
+            if fim is not None:
+                fim_estacao = ini + int(np.searchsorted(datas[ini:fim_estacao], np.datetime64(fim), side='right'))
+            partes.append(np.arange(ini, fim_estacao))
+        return self.df.iloc[np.concatenate(partes)]
+
+    def agregar(self, codigos, variaveis=None, inicio=None, fim=None, resolucao='mensal'):
+        """Séries das estações no intervalo, agregadas pela média de cada período.
+
+        `resolucao`: 'mensal' (sem agregação), 'sazonal' (DJF, MAM, JJA, SON)
+        ou 'anual'. A coluna `Data` passa a ser o início de cada período.
+        """
+        variaveis = variaveis or VARIAVEIS_METEO
+        sel = self.selecionar(codigos, inicio, fim)
+        if resolucao == 'mensal':
+            return sel[['codigo_estacao', 'Data'] + variaveis]
+        periodo = sel['Data'].dt.to_period(RESOLUCOES[resolucao]).dt.start_time
+        agregado = sel.groupby([sel['codigo_estacao'], periodo], observed=True, sort=False)[variaveis].mean()
+        return agregado.reset_index()
+
+    def media_estado(self, periodo='mensal', variaveis=None):
+        """Média entre todas as estações por mês ('mensal') ou por ano ('anual')"""
+        variaveis = variaveis or VARIAVEIS_METEO
+        chave = self.df['Data'] if periodo == 'mensal' else self.df['Data'].dt.year.rename('ano')
+        return self.df.groupby(chave)[variaveis].mean()
+
+
+def obter_base_meteorologica():
+    """Base longa de todas as estações, reconstruída apenas quando os arquivos mudam"""
+    return em_cache('base_meteorologica', listar_arquivos_meteo(),
+                    lambda: BaseMeteorologica(carregar_tabela('meteorologicos')))
+
+
+def obter_base_estacoes(codigos):
+    """Base das estações selecionadas na página.
+
+    Só os arquivos dessas estações entram na chave; ao acrescentar uma cidade,
+    apenas a estação nova é lida (as demais vêm do cache por estação).
+    """
+    codigos = sorted(set(codigos))
+    arquivos = [_arquivo_estacao(codigo)[0] for codigo in codigos]
+    return em_cache('base_estacoes', arquivos, lambda: BaseMeteorologica.de_estacoes(codigos),
+                    codigos=tuple(codigos))
+
+
+# ---------------------------------------------------------------------------
+# Climatologia por estação (calculada uma vez por versão dos dados)
+# ---------------------------------------------------------------------------
+
+ESTATISTICAS_CLIMA = ['contagem', 'media', 'desvio', 'minimo', 'q1', 'mediana', 'q3', 'maximo']
+
+# Rótulos equivalentes aos de DataFrame.describe()
+ROTULOS_DESCRIBE = {
+    'contagem': 'count', 'media': 'mean', 'desvio': 'std', 'minimo': 'min',
+    'q1': '25%', 'mediana': '50%', 'q3': '75%', 'maximo': 'max',
+}
+
+
+def _quantil_grupos(ordenados, inicio, n, q):
+    """Quantil (interpolação linear, como no pandas) de cada grupo de um vetor ordenado por grupo"""
+    pos = q * np.maximum(n - 1, 0)
+    baixo = np.floor(pos).astype(np.int64)
+    alto = np.ceil(pos).astype(np.int64)
+    ultimo = max(len(ordenados) - 1, 0)
+    v_baixo = ordenados[np.minimum(inicio + baixo, ultimo)]
+    v_alto = ordenados[np.minimum(inicio + alto, ultimo)]
+    return np.where(n > 0, v_baixo + (v_alto - v_baixo) * (pos - baixo), np.nan)
+
+
+def estatisticas_grupos(chave, valores, n_grupos):
+    """Estatísticas descritivas de `valores` por grupo (`chave` inteira em [0, n_grupos)).
+
+    Tudo em NumPy: uma ordenação por (grupo, valor) e `bincount`, sem laço
+    em Python sobre os grupos. NaN são ignorados, como em describe().
+    """
+    valores = np.asarray(valores, dtype='float64')
+    validos = ~np.isnan(valores)
+    chave, valores = chave[validos], valores[validos]
+    ordem = np.lexsort((valores, chave))
+    chave, valores = chave[ordem], valores[ordem]
+
+    n = np.bincount(chave, minlength=n_grupos)
+    inicio = np.cumsum(n) - n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.bincount(chave, weights=valores, minlength=n_grupos) / n
+        desvio = np.sqrt(np.bincount(chave, weights=(valores - media[chave]) ** 2, minlength=n_grupos) / (n - 1))
+    return {
+        'contagem': n,
+        'media': media,
+        'desvio': np.where(n > 1, desvio, np.nan),
+        'minimo': _quantil_grupos(valores, inicio, n, 0.0),
+        'q1': _quantil_grupos(valores, inicio, n, 0.25),
+        'mediana': _quantil_grupos(valores, inicio, n, 0.5),
+        'q3': _quantil_grupos(valores, inicio, n, 0.75),
+        'maximo': _quantil_grupos(valores, inicio, n, 1.0),
+    }
+
+
+class Climatologia:
+    """Climatologia de cada estação, a partir da base longa.
+
+    - `mensal`: estatísticas por estação, mês do ano e variável (média,
+      mediana, quartis, extremos);
+    - `resumo`: estatísticas de longo prazo por estação e variável
+      (as mesmas de describe());
+    - `anomalias`: desvio de cada mês em relação à média daquele mês do ano
+      na mesma estação.
+    """
+
+    def __init__(self, base):
+        df = base.df
+        n_estacoes = len(base.estacoes)
+        estacao = df['codigo_estacao'].cat.codes.to_numpy().astype(np.int64)
+        mes = df['Mes'].to_numpy().astype(np.int64) - 1
+        chave_mes = estacao * 12 + mes
+
+        mensal, resumo = [], []
+        anomalias = df[['codigo_estacao', 'Data', 'Mes']].copy()
+        for variavel in VARIAVEIS_METEO:
+            valores = df[variavel].to_numpy()
+            por_mes = estatisticas_grupos(chave_mes, valores, n_estacoes * 12)
+            mensal.append(pd.DataFrame(dict(
+                codigo_estacao=np.repeat(base.estacoes, 12),
+                Mes=np.tile(np.arange(1, 13), n_estacoes),
+                variavel=variavel,
+                **por_mes,
+            )))
+            resumo.append(pd.DataFrame(dict(
+                codigo_estacao=base.estacoes,
+                variavel=variavel,
+                **estatisticas_grupos(estacao, valores, n_estacoes),
+            )))
+            anomalias[variavel] = (valores - por_mes['media'][chave_mes]).astype('float32')
+
+        self.mensal = pd.concat(mensal, ignore_index=True).set_index(['codigo_estacao', 'variavel', 'Mes']).sort_index()
+        self.resumo = pd.concat(resumo, ignore_index=True).set_index(['codigo_estacao', 'variavel']).sort_index()
+        self.anomalias = anomalias
+        self._base = base
+
+    def mes_a_mes(self, codigo, variavel):
+        """Estatísticas de cada mês do ano (índice Mes) de uma variável em uma estação"""
+        return self.mensal.loc[(codigo, variavel)]
+
+    def descricao(self, codigo, variaveis=None):
+        """Tabela no formato de describe() de uma estação"""
+        variaveis = variaveis or VARIAVEIS_METEO
+        tabela = self.resumo.loc[codigo].loc[variaveis, ESTATISTICAS_CLIMA].T
+        tabela.index = [ROTULOS_DESCRIBE[e] for e in tabela.index]
+        tabela.columns.name = None
+        return tabela
+
+    def medias(self, codigos, variavel):
+        """Média de longo prazo de uma variável em cada estação pedida"""
+        return self.resumo.xs(variavel, level='variavel')['media'].reindex(codigos)
+
+    def anomalias_estacao(self, codigo):
+        """Anomalias mensais de uma estação (mesmas colunas de `anomalias`)"""
+        ini, fim = self._base._fatia(codigo)
+        return self.anomalias.iloc[ini:fim]
+
+
+def obter_climatologia(codigos=None):
+    """Climatologia de todas as estações (ou só das `codigos`), recalculada apenas quando os arquivos mudam"""
+    if codigos is None:
+        return em_cache('climatologia', listar_arquivos_meteo(),
+                        lambda: Climatologia(obter_base_meteorologica()))
+    base = obter_base_estacoes(codigos)
+    codigos = tuple(base.estacoes)
+    arquivos = [_arquivo_estacao(codigo)[0] for codigo in codigos]
+    return em_cache('climatologia_estacoes', arquivos, lambda: Climatologia(base), codigos=codigos)
@@ -0,0 +1,402 @@
+"""Previsão da emissão de carbono (agrícola + rebanho) com registro de modelos ajustados.
+
+A emissão simulada é `qtd_cultura * agricola + qtd_rebanho * rebanho`, onde
+`agricola` e `rebanho` são as séries normalizadas (0-1) da cultura e do tipo
+de rebanho escolhidos. Os sliders da página apenas reescalam essas séries:
+
+- Modelos lineares na série (regressão linear): cada componente é ajustado
+  uma vez e a previsão é `qtd_cultura * F(agricola) + qtd_rebanho * F(rebanho)`,
+  sem novo ajuste ao mover os sliders.
+- Demais modelos (invariantes à escala): ajustados sobre a mistura de peso
+  unitário `(qc * agricola + qr * rebanho) / (qc + qr)` e multiplicados por
+  `qc + qr`; a chave usa a proporção qc:qr reduzida, então só mudar a escala
+  (ex.: 10:20 -> 20:40) reaproveita o ajuste.
+
+Os ajustes ficam em memória (LRU) e em disco (pickle em `PASTA_MODELOS`), com
+a versão dos arquivos de origem na chave.
+"""
+import hashlib
+import math
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import (
+    ARQUIVO_AGRICOLAS,
+    ARQUIVO_REBANHOS,
+    DATA_DIR,
+    CacheLRU,
+    assinatura_arquivo,
+    carregar_agricolas,
+    carregar_rebanhos,
+    em_cache,
+)
+from utils.dependencias import importar, registrar_previsao
+
+# Anos previstos após o último ano da série
+HORIZONTE = 5
+
+# Registro de modelos: pasta e limites (MB) em disco e em memória
+PASTA_MODELOS = os.environ.get('CARBON_PASTA_MODELOS', os.path.join(DATA_DIR, 'modelos'))
+MODELOS_DISCO_MB = float(os.environ.get('CARBON_MODELOS_DISCO_MB', '64'))
+MODELOS_MEMORIA_MB = float(os.environ.get('CARBON_MODELOS_MB', '32'))
+
+FONTES_EMISSAO = [ARQUIVO_AGRICOLAS, ARQUIVO_REBANHOS]
+
+# Hiperparâmetros de cada modelo (fazem parte da chave do registro)
+HIPERPARAMETROS = {
+    'Regressão Linear': {'grau': 1},
+    'ARIMA/SARIMA': {'ordem': (1, 1, 1)},
+    'Prophet': {},
+    'LSTM (Deep Learning)': {'unidades': 10, 'epocas': 100},
+    'Random Forest': {'n_estimators': 100, 'random_state': 0},
+}
+
+# Modelos cuja previsão é linear na série ajustada
+MODELOS_LINEARES = {'Regressão Linear'}
+
+# Árvores por lote no ajuste da Random Forest (intervalo entre avisos de progresso)
+ARVORES_POR_LOTE = 10
+
+
+# ---------------------------------------------------------------------------
+# Séries da simulação
+# ---------------------------------------------------------------------------
+
+def componentes_emissao(cultura, rebanho, uf='MS'):
+    """Séries normalizadas da cultura e do rebanho alinhadas por ano (colunas ano, agricola, rebanho).
+
+    Mesmo alinhamento da simulação: junção externa pelo ano (texto), faltantes
+    viram 0 e as linhas ficam ordenadas pelo ano.
+    """
+    def _carregar():
+        df_agricola = carregar_agricolas(uf)
+        serie_agricola = df_agricola[cultura]
+        agricola = pd.DataFrame({
+            'ano': df_agricola['Ano'].astype(str),
+            'agricola': serie_agricola / serie_agricola.max(),
+        })
+
+        df_rebanhos = carregar_rebanhos(uf, colunas=['ano', 'tipo_rebanho', 'quantidade'])
+        df_rebanho = df_rebanhos[df_rebanhos['tipo_rebanho'] == rebanho]
+        maximo = df_rebanho['quantidade'].max()
+        rebanho_norm = pd.DataFrame({
+            'ano': df_rebanho['ano'].astype(str),
+            'rebanho': df_rebanho['quantidade'] / maximo if maximo else 0.0,
+        })
+
+        df = pd.merge(agricola, rebanho_norm, on='ano', how='outer').fillna(0)
+        return df.sort_values('ano', kind='mergesort').reset_index(drop=True)
+    return em_cache('componentes_emissao', FONTES_EMISSAO, _carregar,
+                    cultura=cultura, rebanho=rebanho, uf=uf)
+
+
+def versao_dados():
+    """Versão dos arquivos de origem (assinaturas), parte da chave dos modelos"""
+    return tuple(assinatura_arquivo(c) for c in FONTES_EMISSAO)
+
+
+def _anos_futuros(anos):
+    return np.arange(anos.max() + 1, anos.max() + 1 + HORIZONTE)
+
+
+# ---------------------------------------------------------------------------
+# Ajuste de cada modelo: (anos, y) -> Ajuste
+# ---------------------------------------------------------------------------
+
+class Ajuste:
+    """Modelo ajustado e sua previsão (anos futuros e valores) para uma série"""
+
+    def __init__(self, estimador, anos, valores):
+        self.estimador = estimador
+        self.anos = np.asarray(anos)
+        self.valores = np.asarray(valores, dtype='float64')
+
+    def sem_estimador(self):
+        return Ajuste(None, self.anos, self.valores)
+
+
+def ajustar_linear(anos, y, grau=1):
+    coef = np.polyfit(anos, y, grau)
+    anos_pred = _anos_futuros(anos)
+    return Ajuste(coef, anos_pred, np.poly1d(coef)(anos_pred))
+
+
+def ajustar_arima(anos, y, ordem=(1, 1, 1)):
+    ARIMA = importar('statsmodels').ARIMA
+
+    modelo_ajustado = ARIMA(y, order=ordem).fit()
+    return Ajuste(modelo_ajustado.params, _anos_futuros(anos), modelo_ajustado.forecast(steps=HORIZONTE))
+
+
+def ajustar_prophet(anos, y):
+    Prophet = importar('prophet').Prophet
+
+    df_prophet = pd.DataFrame({'ds': pd.to_datetime(anos.astype(str), format='%Y'), 'y': y})
+    m = Prophet(yearly_seasonality=False, daily_seasonality=False, weekly_seasonality=False)
+    m.fit(df_prophet)
+    future = m.make_future_dataframe(periods=HORIZONTE, freq='Y')
+    forecast_pred = m.predict(future).tail(HORIZONTE)
+    return Ajuste(m, forecast_pred['ds'].dt.year.values, forecast_pred['yhat'].values)
+
+
+def ajustar_random_forest(anos, y, n_estimators=100, random_state=0, progresso=None):
+    RandomForestRegressor = importar('sklearn').RandomForestRegressor
+
+    # Árvores adicionadas em lotes (warm_start): mesma floresta de um ajuste único,
+    # com progresso e pontos de cancelamento entre os lotes
+    rf = RandomForestRegressor(n_estimators=0, random_state=random_state, warm_start=True)
+    for n in range(ARVORES_POR_LOTE, n_estimators + ARVORES_POR_LOTE, ARVORES_POR_LOTE):
+        rf.set_params(n_estimators=min(n, n_estimators))
+        rf.fit(anos.reshape(-1, 1), y)
+        if progresso:
+            progresso(rf.n_estimators / n_estimators)
+    anos_pred = _anos_futuros(anos)
+    return Ajuste(rf, anos_pred, rf.predict(anos_pred.reshape(-1, 1)))
+
+
+def ajustar_lstm(anos, y, unidades=10, epocas=100, progresso=None):
+    keras = importar('tensorflow').keras
+    importar('sklearn')
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler()
+    y_scaled = scaler.fit_transform(y.reshape(-1, 1))
+
+    X_lstm = np.array([y_scaled[i - 1:i, 0] for i in range(1, len(y_scaled))])
+    y_lstm = y_scaled[1:, 0]
+    X_lstm = X_lstm.reshape((X_lstm.shape[0], 1, 1))
+
+    model = keras.Sequential([
+        keras.layers.LSTM(unidades, input_shape=(1, 1)),
+        keras.layers.Dense(1)
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    callbacks = []
+    if progresso:
+        callbacks.append(keras.callbacks.LambdaCallback(
+            on_epoch_end=lambda epoca, logs: progresso((epoca + 1) / epocas)))
+    model.fit(X_lstm, y_lstm, epochs=epocas, verbose=0, callbacks=callbacks)
+
+    last_value = y_scaled[-1].reshape(1, 1, 1)
+    preds = []
+    for _ in range(HORIZONTE):
+        pred = model.predict(last_value, verbose=0)
+        preds.append(pred[0, 0])
+        last_value = pred.reshape(1, 1, 1)
+    valores = scaler.inverse_transform(np.array(preds).reshape(-1, 1)).flatten()
+    return Ajuste(model, _anos_futuros(anos), valores)
+
+
+# Modelos que recebem `progresso` (fração concluída) durante o ajuste
+AJUSTES_COM_PROGRESSO = {'LSTM (Deep Learning)', 'Random Forest'}
+
+AJUSTES = {
+    'Regressão Linear': ajustar_linear,
+    'ARIMA/SARIMA': ajustar_arima,
+    'Prophet': ajustar_prophet,
+    'LSTM (Deep Learning)': ajustar_lstm,
+    'Random Forest': ajustar_random_forest,
+}
+
+
+# ---------------------------------------------------------------------------
+# Registro de modelos (memória + disco)
+# ---------------------------------------------------------------------------
+
+class RegistroModelos:
+    """Ajustes guardados em um LRU de memória e em arquivos pickle com limite de espaço.
+
+    Cada arquivo guarda a chave completa junto do ajuste (colisões de hash e
+    versões antigas são ignoradas). Ao passar do limite, os arquivos usados há
+    mais tempo (mtime, atualizado a cada leitura) são removidos primeiro.
+    Estimadores que não podem ser serializados (ex.: Keras) vão para o disco
+    só com a previsão. Em memória fica sempre só a previsão (`sem_estimador`):
+    as páginas não usam o estimador, que costuma ser o grosso do ajuste.
+    """
+
+    def __init__(self, pasta, max_bytes_disco, max_bytes_memoria):
+        self.pasta = pasta
+        self.max_bytes_disco = max_bytes_disco
+        self._memoria = CacheLRU(max_bytes_memoria)
+        self._lock = threading.Lock()
+        self.leituras_disco = 0
+        self.ajustes = 0
+
+    def _arquivo(self, chave):
+        return os.path.join(self.pasta, hashlib.sha1(repr(chave).encode('utf-8')).hexdigest() + '.pkl')
+
+    def obter(self, chave, ajustar):
+        return self._memoria.obter(chave, lambda: self.obter_disco(chave, ajustar).sem_estimador())
+
+    def consultar(self, chave):
+        """Ajuste já guardado (memória ou disco), ou None, sem ajustar"""
+        try:
+            return self.obter(chave, None)
+        except KeyError:
+            return None
+
+    def guardar(self, chave, ajuste):
+        """Guarda em memória um ajuste feito em outro processo (que já o gravou em disco)"""
+        self._memoria.guardar(chave, ajuste.sem_estimador())
+
+    def obter_disco(self, chave, ajustar):
+        """Ajuste do disco (ou ajustado e gravado), sem passar pelo LRU de memória"""
+        arquivo = self._arquivo(chave)
+        try:
+            with open(arquivo, 'rb') as f:
+                chave_gravada, ajuste = pickle.load(f)
+            if chave_gravada == chave:
+                os.utime(arquivo)
+                self.leituras_disco += 1
+                return ajuste
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            pass
+        if ajustar is None:
+            raise KeyError(chave)
+
+        ajuste = ajustar()
+        self.ajustes += 1
+        self._gravar(arquivo, chave, ajuste)
+        return ajuste
+
+    def _gravar(self, arquivo, chave, ajuste):
+        try:
+            conteudo = pickle.dumps((chave, ajuste))
+        except Exception:
+            conteudo = pickle.dumps((chave, ajuste.sem_estimador()))
+        if len(conteudo) > self.max_bytes_disco:
+            return
+        with self._lock:
+            os.makedirs(self.pasta, exist_ok=True)
+            temporario = f'{arquivo}.{threading.get_ident()}.tmp'
+            with open(temporario, 'wb') as f:
+                f.write(conteudo)
+            os.replace(temporario, arquivo)
+            self._evictar()
+
+    def _arquivos(self):
+        if not os.path.isdir(self.pasta):
+            return []
+        arquivos = []
+        for nome in os.listdir(self.pasta):
+            if nome.endswith('.pkl'):
+                try:
+                    st = os.stat(os.path.join(self.pasta, nome))
+                except FileNotFoundError:
+                    # Removido por outro processo entre o listdir e o stat
+                    continue
+                arquivos.append((st.st_mtime_ns, st.st_size, os.path.join(self.pasta, nome)))
+        return sorted(arquivos)
+
+    def _evictar(self):
+        arquivos = self._arquivos()
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in arquivos:
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+
+    def limpar(self):
+        self._memoria.limpar()
+        with self._lock:
+            for _, _, caminho in self._arquivos():
+                try:
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    pass
+
+    def estatisticas(self):
+        arquivos = self._arquivos()
+        return {
+            'memoria': self._memoria.estatisticas(),
+            'arquivos': len(arquivos),
+            'bytes_disco': sum(tamanho for _, tamanho, _ in arquivos),
+            'max_bytes_disco': self.max_bytes_disco,
+            'leituras_disco': self.leituras_disco,
+            'ajustes': self.ajustes,
+        }
+
+
+registro = RegistroModelos(PASTA_MODELOS, int(MODELOS_DISCO_MB * 1024 * 1024),
+                           int(MODELOS_MEMORIA_MB * 1024 * 1024))
+
+def ajustar_serie(modelo, anos, y, progresso=None):
+    """Ajusta o modelo a uma série; `progresso(fracao)` é chamado durante o ajuste"""
+    inicio = time.perf_counter()
+    hiperparametros = dict(HIPERPARAMETROS[modelo])
+    if progresso:
+        progresso(0.0)
+    if modelo in AJUSTES_COM_PROGRESSO:
+        hiperparametros['progresso'] = progresso
+    ajuste = AJUSTES[modelo](anos, y, **hiperparametros)
+    # Inclui o import da biblioteca quando é o primeiro uso no processo
+    registrar_previsao(modelo, time.perf_counter() - inicio)
+    if progresso:
+        progresso(1.0)
+    return ajuste
+
+
+def series_da_previsao(modelo, cultura, rebanho, qtd_cultura, qtd_rebanho, uf='MS'):
+    """Séries a ajustar para uma previsão: (anos, [(chave, y, peso), ...]).
+
+    A previsão é a soma de `peso * previsão` de cada série. Retorna None com
+    menos de dois anos de dados; a lista vem vazia se as duas quantidades são 0.
+    """
+    df = componentes_emissao(cultura, rebanho, uf)
+    if len(df) < 2:
+        return None
+    anos = df['ano'].astype(int).to_numpy()
+    serie_base = (modelo, cultura, rebanho, uf, versao_dados(), tuple(sorted(HIPERPARAMETROS[modelo].items())))
+
+    if modelo in MODELOS_LINEARES:
+        return anos, [(serie_base + ('agricola',), df['agricola'].to_numpy(), qtd_cultura),
+                      (serie_base + ('rebanho',), df['rebanho'].to_numpy(), qtd_rebanho)]
+    if qtd_cultura + qtd_rebanho == 0:
+        return anos, []
+    # Mistura de peso unitário, identificada pela proporção reduzida qc:qr
+    divisor = math.gcd(int(qtd_cultura), int(qtd_rebanho))
+    proporcao = (int(qtd_cultura) // divisor, int(qtd_rebanho) // divisor)
+    escala = qtd_cultura + qtd_rebanho
+    y = (qtd_cultura * df['agricola'].to_numpy() + qtd_rebanho * df['rebanho'].to_numpy()) / escala
+    return anos, [(serie_base + (('proporcao',) + proporcao,), y, escala)]
+
+
+def prever(modelo, cultura, rebanho, qtd_cultura, qtd_rebanho, uf='MS', ajustar=True):
+    """Previsão da emissão total para os próximos anos (índice 'ano' em texto, coluna emissao_total).
+
+    Os sliders só reescalam ajustes guardados no registro; um novo ajuste
+    acontece apenas para uma combinação ainda não vista de modelo, séries,
+    versão dos dados, hiperparâmetros e (nos modelos não lineares) proporção qc:qr.
+    Com `ajustar=False`, retorna None se falta algum ajuste (ver utils/tarefas.py).
+    """
+    series = series_da_previsao(modelo, cultura, rebanho, qtd_cultura, qtd_rebanho, uf)
+    if series is None:
+        return pd.DataFrame(columns=['emissao_total'])
+    anos, partes = series
+
+    anos_pred, valores = _anos_futuros(anos), np.zeros(HORIZONTE)
+    for i, (chave, y, peso) in enumerate(partes):
+        if ajustar:
+            ajuste = registro.obter(chave, lambda: ajustar_serie(modelo, anos, y))
+        else:
+            ajuste = registro.consultar(chave)
+        if ajuste is None:
+            return None
+        if i == 0:
+            anos_pred = ajuste.anos
+        valores = valores + peso * ajuste.valores
+
+    return pd.DataFrame({'ano': np.asarray(anos_pred).astype(str), 'emissao_total': valores}).set_index('ano')
+
+
+def estatisticas_modelos():
+    return registro.estatisticas()
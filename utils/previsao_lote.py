@@ -0,0 +1,216 @@
+"""Previsões em lote para todas as combinações de cultura × tipo de rebanho.
+
+Usa as quantidades padrão da página de análise preditiva (médias da cultura e
+do rebanho) e grava uma tabela por modelo em `PASTA_PREVISOES`, que pode ser
+servida sem novos ajustes enquanto os dados e os hiperparâmetros não mudam:
+
+- Regressão linear: mínimos quadrados empilhados, com todas as séries
+  resolvidas de uma vez por somas agrupadas (`np.bincount`), sem um
+  `np.polyfit` por série.
+- Demais modelos: os ajustes que faltam no registro vão para o pool de
+  processos (utils/tarefas.py) e rodam em paralelo; a página acompanha as
+  tarefas sem esperar (`submeter_lote` / `montar_lote`).
+
+Uso pela linha de comando: `python gerar_previsoes.py`.
+"""
+import glob
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import DATA_DIR, carregar_agricolas, carregar_rebanhos, em_cache
+from utils.previsao import (
+    HIPERPARAMETROS,
+    HORIZONTE,
+    MODELOS_LINEARES,
+    componentes_emissao,
+    prever,
+    series_da_previsao,
+    versao_dados,
+)
+from utils.rebanhos import dobrar_acentos
+
+PASTA_PREVISOES = os.path.join(DATA_DIR, 'previsoes')
+
+COLUNAS_PREVISOES = ['modelo', 'cultura', 'rebanho', 'qtd_cultura', 'qtd_rebanho', 'ano', 'emissao_total']
+
+
+def combinacoes(uf='MS'):
+    """Pares (cultura, tipo de rebanho) disponíveis na UF"""
+    culturas = list(carregar_agricolas(uf).columns[1:])
+    tipos = carregar_rebanhos(uf, colunas=['tipo_rebanho'])['tipo_rebanho']
+    rebanhos = list(tipos.cat.remove_unused_categories().cat.categories)
+    return [(cultura, rebanho) for cultura in culturas for rebanho in rebanhos]
+
+
+def quantidades_padrao(uf='MS'):
+    """Valores iniciais dos sliders da página: média da cultura e média do rebanho"""
+    df_agricola = carregar_agricolas(uf)
+    df_rebanhos = carregar_rebanhos(uf, colunas=['tipo_rebanho', 'quantidade'])
+    culturas = {c: df_agricola[c].mean() for c in df_agricola.columns[1:]}
+    rebanhos = df_rebanhos.groupby('tipo_rebanho', observed=True)['quantidade'].mean().to_dict()
+    inteiro = lambda v: 0 if pd.isna(v) else int(v)
+    return ({c: inteiro(v) for c, v in culturas.items()},
+            {str(r): inteiro(v) for r, v in rebanhos.items()})
+
+
+def _tabela(linhas):
+    if not linhas:
+        return pd.DataFrame(columns=COLUNAS_PREVISOES)
+    return pd.DataFrame(linhas, columns=COLUNAS_PREVISOES)
+
+
+def prever_linear_lote(modelo, pares, qtd_culturas, qtd_rebanhos, uf='MS'):
+    """Regressão linear de todas as séries em um único sistema empilhado.
+
+    Cada série s tem as componentes agricola e rebanho; com x centrado na
+    média da série, inclinação = Σ(xc·y) / Σ(xc²) e intercepto = média de y,
+    somados por série com `np.bincount`. Mesmo resultado de `np.polyfit(x, y, 1)`.
+    """
+    series = [componentes_emissao(cultura, rebanho, uf) for cultura, rebanho in pares]
+    tamanhos = np.array([len(df) for df in series])
+    ids = np.repeat(np.arange(len(series)), tamanhos)
+    x = np.concatenate([df['ano'].astype(int).to_numpy() for df in series]).astype('float64')
+    y = np.column_stack([
+        np.concatenate([df['agricola'].to_numpy() for df in series]),
+        np.concatenate([df['rebanho'].to_numpy() for df in series]),
+    ])
+
+    n = np.maximum(tamanhos, 1)
+    x_media = np.bincount(ids, x, minlength=len(series)) / n
+    xc = x - x_media[ids]
+    sxx = np.bincount(ids, xc * xc, minlength=len(series))
+    y_media = np.column_stack([np.bincount(ids, y[:, k], minlength=len(series)) / n for k in range(2)])
+    sxy = np.column_stack([np.bincount(ids, xc * y[:, k], minlength=len(series)) for k in range(2)])
+    validas = (tamanhos >= 2) & (sxx > 0)
+    inclinacao = np.divide(sxy, sxx[:, None], out=np.zeros_like(sxy), where=validas[:, None])
+
+    # Anos futuros por série: HORIZONTE anos após o último ano de cada uma
+    x_max = np.full(len(series), -np.inf)
+    np.maximum.at(x_max, ids, x)
+    passos = np.arange(1, HORIZONTE + 1)
+    anos_pred = x_max[:, None] + passos[None, :]
+    componentes = y_media[:, None, :] + inclinacao[:, None, :] * (anos_pred - x_media[:, None])[:, :, None]
+
+    qc = np.array([qtd_culturas[c] for c, _ in pares], dtype='float64')
+    qr = np.array([qtd_rebanhos[r] for _, r in pares], dtype='float64')
+    emissao = qc[:, None] * componentes[:, :, 0] + qr[:, None] * componentes[:, :, 1]
+
+    linhas = []
+    for s in np.flatnonzero(validas):
+        cultura, rebanho = pares[s]
+        for ano, valor in zip(anos_pred[s], emissao[s]):
+            linhas.append((modelo, cultura, rebanho, int(qc[s]), int(qr[s]),
+                           str(int(ano)), valor))
+    return _tabela(linhas)
+
+
+def submeter_lote(modelo, uf='MS'):
+    """Submete ao pool de processos os ajustes de todas as combinações, sem esperar.
+
+    Retorna {(cultura, rebanho, chave): tarefa}; acompanhe com
+    `utils.tarefas.acompanhar` e monte a tabela com `montar_lote`.
+    """
+    # Import local: utils.tarefas inicia o processo servidor no primeiro uso
+    from utils.tarefas import submeter
+
+    qtd_culturas, qtd_rebanhos = quantidades_padrao(uf)
+    tarefas = {}
+    for cultura, rebanho in combinacoes(uf):
+        series = series_da_previsao(modelo, cultura, rebanho, qtd_culturas[cultura], qtd_rebanhos[rebanho], uf)
+        if series is None:
+            continue
+        anos, partes = series
+        for chave, y, _ in partes:
+            tarefas[(cultura, rebanho, chave)] = submeter(modelo, chave, anos, y)
+    return tarefas
+
+
+def montar_lote(modelo, tarefas, uf='MS'):
+    """Tabela do lote a partir do registro, depois que as tarefas terminaram.
+
+    Retorna (tabela, erros), com erros = {(cultura, rebanho): mensagem}.
+    """
+    qtd_culturas, qtd_rebanhos = quantidades_padrao(uf)
+    erros = {(c, r): str(t.erro()) for (c, r, _), t in tarefas.items() if t.erro() is not None}
+    linhas = []
+    for cultura, rebanho in combinacoes(uf):
+        if (cultura, rebanho) in erros:
+            continue
+        qc, qr = qtd_culturas[cultura], qtd_rebanhos[rebanho]
+        previsao = prever(modelo, cultura, rebanho, qc, qr, uf, ajustar=False)
+        if previsao is None:
+            erros[(cultura, rebanho)] = 'ajuste cancelado'
+            continue
+        for ano, valor in previsao['emissao_total'].items():
+            linhas.append((modelo, cultura, rebanho, qc, qr, ano, valor))
+    return _tabela(linhas), erros
+
+
+def prever_lote(modelo, uf='MS', ao_progredir=None):
+    """Previsões do modelo para todas as combinações, nas quantidades padrão.
+
+    Espera os ajustes terminarem (linha de comando); a página usa
+    `submeter_lote` e `montar_lote`. Retorna (tabela, erros).
+    """
+    if modelo in MODELOS_LINEARES:
+        pares = combinacoes(uf)
+        qtd_culturas, qtd_rebanhos = quantidades_padrao(uf)
+        tabela = prever_linear_lote(modelo, pares, qtd_culturas, qtd_rebanhos, uf)
+        if ao_progredir:
+            ao_progredir(1.0)
+        return tabela, {}
+
+    from utils.tarefas import aguardar
+
+    tarefas = submeter_lote(modelo, uf)
+    if tarefas:
+        aguardar(list(tarefas.values()), ao_progredir)
+    return montar_lote(modelo, tarefas, uf)
+
+
+# ---------------------------------------------------------------------------
+# Tabelas gravadas
+# ---------------------------------------------------------------------------
+
+def _prefixo(modelo, uf):
+    return f"previsoes_{uf}_{re.sub(r'[^a-z0-9]+', '_', dobrar_acentos(modelo)).strip('_')}"
+
+
+def arquivo_previsoes(modelo, uf='MS'):
+    """Caminho da tabela do modelo; o nome inclui a versão dos dados e os hiperparâmetros"""
+    versao = repr((versao_dados(), tuple(sorted(HIPERPARAMETROS[modelo].items()))))
+    sufixo = hashlib.sha1(versao.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(PASTA_PREVISOES, f'{_prefixo(modelo, uf)}_{sufixo}.feather')
+
+
+def gravar_tabela(modelo, tabela, uf='MS'):
+    """Grava a tabela do modelo, removendo versões anteriores. Retorna o caminho"""
+    caminho = arquivo_previsoes(modelo, uf)
+    os.makedirs(PASTA_PREVISOES, exist_ok=True)
+    temporario = caminho + '.tmp'
+    tabela.reset_index(drop=True).to_feather(temporario)
+    os.replace(temporario, caminho)
+    # Versões anteriores (e as cópias em CSV delas)
+    atual = os.path.splitext(caminho)[0]
+    for antigo in glob.glob(os.path.join(glob.escape(PASTA_PREVISOES), f'{_prefixo(modelo, uf)}_*')):
+        if os.path.splitext(antigo)[0] != atual:
+            os.remove(antigo)
+    return caminho
+
+
+def gravar_previsoes(modelo, uf='MS', ao_progredir=None):
+    """Calcula e grava a tabela do modelo. Retorna (tabela, erros, caminho)"""
+    tabela, erros = prever_lote(modelo, uf, ao_progredir)
+    return tabela, erros, gravar_tabela(modelo, tabela, uf)
+
+
+def carregar_previsoes(modelo, uf='MS'):
+    """Tabela gravada para a versão atual dos dados, ou None se ainda não foi gerada"""
+    caminho = arquivo_previsoes(modelo, uf)
+    if not os.path.exists(caminho):
+        return None
+    return em_cache('previsoes_lote', [caminho], lambda: pd.read_feather(caminho))
@@ -0,0 +1,227 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import (
+    ARQUIVO_MUNICIPIOS,
+    ARQUIVO_REBANHOS,
+    carregar_dados_rebanho,
+    carregar_municipios,
+    carregar_rebanhos,
+    em_cache,
+    valores_rebanhos,
+)
+
+# Arquivos de origem dos agregados de rebanho (versão dos dados do cubo e dos gráficos)
+FONTES_REBANHO = [ARQUIVO_REBANHOS, ARQUIVO_MUNICIPIOS]
+
+
+class IndiceAno:
+    """Partição de um DataFrame por ano: as linhas ficam ordenadas por ano e os
+    limites de cada ano são achados com `searchsorted`, de modo que recortar um
+    ano (ou um intervalo de anos) custa O(linhas do recorte), sem varrer a tabela.
+    """
+
+    def __init__(self, df, coluna='ano'):
+        self.df = df.sort_values(coluna, kind='mergesort').reset_index(drop=True)
+        self._anos = self.df[coluna].to_numpy()
+        self.anos = [int(a) for a in np.unique(self._anos)]
+
+    def _limites(self, inicio, fim):
+        return (int(np.searchsorted(self._anos, inicio, side='left')),
+                int(np.searchsorted(self._anos, fim, side='right')))
+
+    def ano(self, ano):
+        ini, fim = self._limites(ano, ano)
+        return self.df.iloc[ini:fim]
+
+    def intervalo(self, inicio, fim):
+        ini, fim = self._limites(inicio, fim)
+        return self.df.iloc[ini:fim]
+
+
+class CuboRebanho:
+    """Agregados do efetivo dos rebanhos (ano × tipo × município) calculados uma única vez.
+
+    Os gráficos da página de rebanhos apenas recortam estas tabelas, em vez de
+    refazer um groupby sobre todas as linhas a cada interação.
+    """
+
+    def __init__(self, df):
+        # Soma por ano, município e tipo, particionada por ano
+        municipios = (
+            df.groupby(['ano', 'nome', 'tipo_rebanho'], observed=True)['quantidade']
+            .sum()
+            .sort_index()
+            .reset_index()
+        )
+        self.municipios = IndiceAno(municipios)
+
+        # Totais por ano e tipo, com a taxa de crescimento ano a ano
+        # (sort_index explícito: com observed=True o pandas 1.5 mantém a ordem de aparição)
+        totais = df.groupby(['ano', 'tipo_rebanho'], observed=True)['quantidade'].sum().sort_index().reset_index()
+        totais['taxa_crescimento'] = totais.groupby('tipo_rebanho', observed=True)['quantidade'].pct_change() * 100
+        self.totais = IndiceAno(totais)
+
+        # Estatísticas descritivas por ano e tipo (entre municípios)
+        estatisticas = df.groupby(['ano', 'tipo_rebanho'], observed=True)['quantidade'].agg(
+            ['sum', 'mean', 'std', 'min', 'max']
+        ).round(2)
+        estatisticas.columns = ['Total', 'Média por Município', 'Desvio Padrão', 'Mínimo', 'Máximo']
+        self.estatisticas = IndiceAno(estatisticas.sort_index().reset_index())
+
+        self.anos = self.totais.anos
+        self.tipos = list(totais['tipo_rebanho'].unique())
+
+    def evolucao(self, inicio=None, fim=None):
+        """Total por ano e tipo de rebanho (colunas ano, tipo_rebanho, quantidade, taxa_crescimento)"""
+        if inicio is None and fim is None:
+            return self.totais.df
+        inicio = self.anos[0] if inicio is None else inicio
+        fim = self.anos[-1] if fim is None else fim
+        return self.totais.intervalo(inicio, fim)
+
+    def composicao(self, ano):
+        """Total por tipo de rebanho em um ano"""
+        return self.totais.ano(ano).set_index('tipo_rebanho')['quantidade']
+
+    def distribuicao_municipios(self, ano):
+        """Quantidade por município e tipo de rebanho em um ano"""
+        return self.municipios.ano(ano)[['nome', 'tipo_rebanho', 'quantidade']]
+
+    def estatisticas_ano(self, ano):
+        return self.estatisticas.ano(ano).drop(columns='ano').set_index('tipo_rebanho')
+
+
+def obter_cubo_rebanho(uf='MS'):
+    """Cubo de agregados da UF, reconstruído apenas quando os arquivos de origem mudam"""
+    return em_cache('cubo_rebanho', FONTES_REBANHO,
+                    lambda: CuboRebanho(carregar_dados_rebanho(uf)), uf=uf)
+
+
+# ---------------------------------------------------------------------------
+# Vocabulário dos tipos de rebanho
+# ---------------------------------------------------------------------------
+
+def dobrar_acentos(texto):
+    """Minúsculas, sem acentos, hífens nem espaços repetidos ('Suíno - total' -> 'suino total')"""
+    sem_acento = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sem_acento.lower().replace('-', ' ').split())
+
+
+class VocabularioRebanho:
+    """Tabela canônica dos tipos de rebanho: um código inteiro por categoria e
+    os apelidos (sem acento) que levam a cada código.
+
+    Cada rótulo 'Grupo - detalhe' aceita o próprio rótulo, 'grupo detalhe'
+    com só a primeira palavra do detalhe ('suino matrizes') e 'grupo' quando
+    o grupo tem um único tipo ou um tipo 'total'. Filtrar por tipo compara os
+    códigos da coluna categórica, sem tratar strings linha a linha.
+    """
+
+    def __init__(self, categorias):
+        self.categorias = [str(c) for c in categorias]
+        self.apelidos = {}
+        grupos = {}
+        for codigo, rotulo in enumerate(self.categorias):
+            self.apelidos[dobrar_acentos(rotulo)] = codigo
+            grupo, _, detalhe = rotulo.partition(' - ')
+            grupos.setdefault(dobrar_acentos(grupo), []).append((codigo, dobrar_acentos(detalhe)))
+
+        for grupo, membros in grupos.items():
+            for codigo, detalhe in membros:
+                if detalhe:
+                    self.apelidos.setdefault(f'{grupo} {detalhe.split()[0]}', codigo)
+                if len(membros) == 1 or detalhe == 'total':
+                    self.apelidos.setdefault(grupo, codigo)
+
+    def codigo(self, nome):
+        """Código canônico de um rótulo ou apelido (None se desconhecido)"""
+        return self.apelidos.get(dobrar_acentos(nome))
+
+    def rotulo(self, nome):
+        codigo = self.codigo(nome)
+        return None if codigo is None else self.categorias[codigo]
+
+    def codigos(self, nomes):
+        """Códigos dos nomes reconhecidos, na ordem pedida"""
+        return [c for c in (self.codigo(n) for n in nomes) if c is not None]
+
+    def mascara(self, serie, nomes):
+        """Linhas de uma coluna categórica cujos tipos estão em `nomes` (comparação de inteiros)"""
+        rotulos = [self.categorias[c] for c in self.codigos(nomes)]
+        # Códigos na própria coluna (as categorias podem estar em outra ordem)
+        codigos = serie.cat.categories.get_indexer(rotulos)
+        return np.isin(serie.cat.codes.to_numpy(), codigos[codigos >= 0])
+
+
+def obter_vocabulario_rebanho():
+    """Vocabulário montado uma vez a partir dos valores distintos de `tipo_rebanho`"""
+    return em_cache('vocabulario_rebanho', FONTES_REBANHO,
+                    lambda: VocabularioRebanho(valores_rebanhos('tipo_rebanho')))
+
+
+# ---------------------------------------------------------------------------
+# Distribuição espacial (centroides dos municípios)
+# ---------------------------------------------------------------------------
+
+def carregar_centroides(uf='MS'):
+    """Centroides dos municípios da UF, com o WKT `POINT(lon lat)` já convertido em floats.
+
+    Ordenado por `id_municipio`, de modo que as posições dos municípios podem
+    ser achadas com `searchsorted` sobre os códigos inteiros.
+    """
+    def _carregar():
+        df = carregar_municipios(uf, colunas=['id_municipio', 'nome', 'centroide'])
+        coordenadas = df['centroide'].str.extract(r'POINT\s*\(\s*(\S+)\s+(\S+)\s*\)').astype('float64')
+        df = pd.DataFrame({
+            'id_municipio': df['id_municipio'].to_numpy(),
+            'nome': df['nome'].to_numpy(),
+            'longitude': coordenadas[0].to_numpy(),
+            'latitude': coordenadas[1].to_numpy(),
+        })
+        return df.dropna(subset=['longitude', 'latitude']).sort_values('id_municipio').reset_index(drop=True)
+    return em_cache('centroides', [ARQUIVO_MUNICIPIOS], _carregar, uf=uf)
+
+
+class MapaRebanho:
+    """Efetivo por ano × tipo × município em um array denso alinhado aos centroides.
+
+    Os municípios são ligados pelo `id_municipio` inteiro (sem merge por nome);
+    trocar o ano ou o tipo de rebanho apenas seleciona outro vetor de valores,
+    na mesma ordem das coordenadas.
+    """
+
+    def __init__(self, df, centroides):
+        self.centroides = centroides
+        ids = centroides['id_municipio'].to_numpy()
+        self.anos = [int(a) for a in np.unique(df['ano'])]
+        self.tipos = sorted(df['tipo_rebanho'].unique().tolist())
+
+        # Posições de cada linha nos três eixos
+        i_mun = np.searchsorted(ids, df['id_municipio'].to_numpy())
+        i_mun = np.minimum(i_mun, len(ids) - 1)
+        encontrado = ids[i_mun] == df['id_municipio'].to_numpy()
+        i_ano = np.searchsorted(self.anos, df['ano'].to_numpy())
+        i_tipo = np.searchsorted(self.tipos, df['tipo_rebanho'].astype(str).to_numpy())
+
+        forma = (len(self.anos), len(self.tipos), len(ids))
+        indices = (i_ano[encontrado], i_tipo[encontrado], i_mun[encontrado])
+        valores = np.zeros(forma)
+        contagem = np.zeros(forma, dtype=np.int32)
+        np.add.at(valores, indices, df['quantidade'].to_numpy()[encontrado])
+        np.add.at(contagem, indices, 1)
+        # Município sem registro no ano/tipo: NaN (não aparece no mapa)
+        valores[contagem == 0] = np.nan
+        self.valores = valores
+
+    def vetor(self, ano, tipo):
+        """Valores do ano e tipo, na ordem de `centroides`"""
+        return self.valores[self.anos.index(ano), self.tipos.index(tipo)]
+
+
+def obter_mapa_rebanho(uf='MS'):
+    """Mapa de valores da UF, reconstruído apenas quando os arquivos de origem mudam"""
+    return em_cache('mapa_rebanho', FONTES_REBANHO,
+                    lambda: MapaRebanho(carregar_rebanhos(uf), carregar_centroides(uf)), uf=uf)
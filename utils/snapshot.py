@@ -0,0 +1,238 @@
+"""Snapshot colunar (Arrow/Feather) dos dados brutos.
+
+Cada tabela normalizada é gravada em `data/snapshot/<nome>.feather` (sem
+compressão, para leitura com memory-map) e registrada em `manifest.json` com o
+hash SHA-256, o mtime e o tamanho de cada arquivo de origem. O snapshot só é
+usado enquanto as origens continuarem iguais às registradas no manifesto.
+Tabelas particionadas (ex.: rebanhos por UF) ficam em `data/snapshot/<nome>/`,
+um arquivo por valor da coluna de partição.
+O pyarrow é opcional: sem ele as páginas continuam lendo os arquivos brutos.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    pc = None
+    feather = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "data", "snapshot")
+MANIFESTO = os.path.join(SNAPSHOT_DIR, "manifest.json")
+
+
+def disponivel():
+    return feather is not None
+
+
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _relativo(caminho):
+    return os.path.relpath(os.path.abspath(caminho), BASE_DIR)
+
+
+def descrever_fonte(caminho):
+    st = os.stat(caminho)
+    return {
+        'caminho': _relativo(caminho),
+        'sha256': hash_arquivo(caminho),
+        'mtime_ns': st.st_mtime_ns,
+        'tamanho': st.st_size,
+    }
+
+
+def ler_manifesto():
+    if not os.path.exists(MANIFESTO):
+        return {}
+    with open(MANIFESTO, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _gravar_manifesto(manifesto):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    temporario = MANIFESTO + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, MANIFESTO)
+
+
+def caminho_snapshot(nome):
+    return os.path.join(SNAPSHOT_DIR, f"{nome}.feather")
+
+
+def _fonte_inalterada(registro, caminho):
+    """Compara uma fonte com o manifesto: mtime/tamanho primeiro, hash só se necessário"""
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return False
+    if st.st_size != registro['tamanho']:
+        return False
+    if st.st_mtime_ns == registro['mtime_ns']:
+        return True
+    # O arquivo foi tocado (cópia, checkout do git...): decide pelo conteúdo
+    return hash_arquivo(caminho) == registro['sha256']
+
+
+def snapshot_valido(nome, fontes, manifesto=None):
+    """Caminho do snapshot da tabela se ele existir e estiver em dia com as fontes, senão None"""
+    if feather is None:
+        return None
+    if manifesto is None:
+        manifesto = ler_manifesto()
+    entrada = manifesto.get(nome)
+    if not entrada:
+        return None
+    caminho = os.path.join(BASE_DIR, entrada['arquivo'])
+    if not os.path.exists(caminho):
+        return None
+    registros = {r['caminho']: r for r in entrada['fontes']}
+    if set(registros) != {_relativo(c) for c in fontes}:
+        return None
+    for fonte in fontes:
+        if not _fonte_inalterada(registros[_relativo(fonte)], fonte):
+            return None
+    return caminho
+
+
+def _registrar(nome, caminho, linhas, fontes, **extras):
+    manifesto = ler_manifesto()
+    manifesto[nome] = dict({
+        'arquivo': _relativo(caminho),
+        'linhas': int(linhas),
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+        'fontes': [descrever_fonte(f) for f in fontes],
+    }, **extras)
+    _gravar_manifesto(manifesto)
+
+
+def gravar_snapshot(nome, df, fontes):
+    """Grava a tabela normalizada e registra as fontes no manifesto"""
+    if feather is None:
+        raise RuntimeError("pyarrow não está instalado; não é possível gravar o snapshot.")
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    caminho = caminho_snapshot(nome)
+    temporario = caminho + '.tmp'
+    feather.write_feather(df.reset_index(drop=True), temporario, compression='uncompressed')
+    os.replace(temporario, caminho)
+    _registrar(nome, caminho, len(df), fontes)
+    return caminho
+
+
+def pasta_particoes(nome):
+    return os.path.join(SNAPSHOT_DIR, nome)
+
+
+def gravar_particoes(nome, particoes, fontes, coluna):
+    """Grava uma tabela particionada (um Feather por valor de `coluna`) e registra no manifesto.
+
+    `particoes` é um iterável de pares (valor, DataFrame); cada partição é
+    gravada assim que chega, então só uma delas precisa estar em memória.
+    """
+    if feather is None:
+        raise RuntimeError("pyarrow não está instalado; não é possível gravar o snapshot.")
+    pasta = pasta_particoes(nome)
+    temporaria = pasta + '.tmp'
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+    linhas = {}
+    for valor, df in particoes:
+        feather.write_feather(df.reset_index(drop=True), os.path.join(temporaria, f"{valor}.feather"),
+                              compression='uncompressed')
+        linhas[str(valor)] = int(len(df))
+
+    # Troca a pasta antiga pela nova só depois de todas as partições gravadas
+    antiga = pasta + '.old'
+    shutil.rmtree(antiga, ignore_errors=True)
+    if os.path.exists(pasta):
+        os.replace(pasta, antiga)
+    os.replace(temporaria, pasta)
+    shutil.rmtree(antiga, ignore_errors=True)
+    # Snapshot não particionado de uma versão anterior
+    if os.path.exists(caminho_snapshot(nome)):
+        os.remove(caminho_snapshot(nome))
+    _registrar(nome, pasta, sum(linhas.values()), fontes, particionado_por=coluna, particoes=linhas)
+    return pasta
+
+
+def ler_particoes(pasta, valores=None, colunas=None, filtros=None):
+    """Lê só as partições pedidas (todas, se `valores` for None) de uma tabela particionada"""
+    if valores is None:
+        arquivos = sorted(os.path.join(pasta, a) for a in os.listdir(pasta) if a.endswith('.feather'))
+    else:
+        arquivos = [os.path.join(pasta, f"{v}.feather") for v in valores]
+        arquivos = [a for a in arquivos if os.path.exists(a)]
+    partes = [ler_snapshot(a, colunas, filtros) for a in arquivos]
+    if not partes:
+        # Nenhuma partição com esses valores: tabela vazia com o esquema da primeira
+        primeiro = next(a for a in os.listdir(pasta) if a.endswith('.feather'))
+        return ler_snapshot(os.path.join(pasta, primeiro), colunas, filtros).iloc[:0]
+    if len(partes) == 1:
+        return partes[0]
+    categoricas = list(partes[0].select_dtypes('category').columns)
+    df = pd.concat(partes, ignore_index=True)
+    # Partições com categorias diferentes viram object no concat
+    return df.astype({c: 'category' for c in categoricas})
+
+
+def valores_distintos(nome, coluna):
+    """Valores distintos (ordenados) de uma coluna do snapshot, sem convertê-la para pandas.
+
+    Se a tabela é particionada pela própria coluna, os valores são as
+    partições registradas no manifesto; senão, a coluna de cada arquivo é
+    lida com memory-map e os distintos são acumulados bloco a bloco.
+    """
+    entrada = ler_manifesto()[nome]
+    if entrada.get('particionado_por') == coluna:
+        return sorted(entrada['particoes'])
+    caminho = os.path.join(BASE_DIR, entrada['arquivo'])
+    if os.path.isdir(caminho):
+        arquivos = sorted(os.path.join(caminho, a) for a in os.listdir(caminho) if a.endswith('.feather'))
+    else:
+        arquivos = [caminho]
+    valores = set()
+    for arquivo in arquivos:
+        for bloco in feather.read_table(arquivo, columns=[coluna], memory_map=True)[coluna].chunks:
+            valores.update(pc.unique(bloco).to_pylist())
+    valores.discard(None)
+    return sorted(valores)
+
+
+def ler_snapshot(caminho, colunas=None, filtros=None):
+    """Lê o snapshot com memory-map (sem cópia dos buffers Arrow sempre que possível).
+
+    `colunas` projeta as colunas lidas e `filtros` ({coluna: tupla de valores})
+    seleciona as linhas ainda na tabela Arrow, antes da conversão para pandas.
+    """
+    filtros = filtros or {}
+    leitura = None
+    if colunas is not None:
+        leitura = list(dict.fromkeys(list(colunas) + list(filtros)))
+    tabela = feather.read_table(caminho, columns=leitura, memory_map=True)
+    for coluna, valores in filtros.items():
+        tabela = tabela.filter(pc.is_in(tabela[coluna], value_set=pa.array(list(valores))))
+    if colunas is not None:
+        tabela = tabela.select(list(colunas))
+    df = tabela.to_pandas(split_blocks=True)
+    # O dicionário Arrow guarda as categorias na ordem de aparição; o pandas
+    # (read_csv com dtype category) as ordena, e os agrupamentos dependem disso
+    for coluna in df.select_dtypes('category').columns:
+        categorias = df[coluna].cat.categories
+        if not categorias.is_monotonic_increasing:
+            df[coluna] = df[coluna].cat.reorder_categories(categorias.sort_values())
+    return df
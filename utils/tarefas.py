@@ -0,0 +1,345 @@
+"""Ajustes de modelos em segundo plano, em um pool limitado de processos.
+
+As páginas submetem os ajustes que faltam no registro (utils/previsao.py) e
+acompanham o progresso com `acompanhar`, que consulta as tarefas sem esperar;
+a thread da sessão (e a de outros usuários) não fica presa durante o treino.
+Pedidos iguais de sessões diferentes compartilham a mesma tarefa; uma tarefa
+só é cancelada quando nenhuma sessão espera mais por ela.
+
+O pool vive em um processo servidor próprio, iniciado no primeiro uso com
+`python -m utils.tarefas` e encerrado junto com o processo que o iniciou. Sob
+o Streamlit, `__main__` é a página em execução (trocada a cada rerun), e
+processos criados com 'spawn' a partir dele reexecutariam a página; no
+servidor, o módulo principal é este, que pode ser importado sem efeitos.
+"""
+import multiprocessing
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import BaseManager
+
+from utils.data_processing import BASE_DIR
+from utils.dependencias import mesclar_tempos, tempos
+from utils.previsao import ajustar_serie, registro
+
+# Processos de ajuste simultâneos (os pedidos excedentes esperam na fila)
+MAX_PROCESSOS = int(os.environ.get('CARBON_PROCESSOS_PREVISAO', str(min(2, os.cpu_count() or 1))))
+
+# Tempo (s) em que tarefas terminadas continuam consultáveis pelo id
+RETENCAO_TAREFAS = 600
+
+TERMINADAS = ('concluida', 'cancelada', 'erro')
+
+
+class TarefaCancelada(Exception):
+    """Interrompe um ajuste cujo resultado ninguém espera mais"""
+
+
+def _executar(id_tarefa, modelo, chave, anos, y, progresso, canceladas):
+    """Executada no processo de trabalho: ajusta a série e grava o ajuste no registro em disco"""
+    def _progresso(fracao):
+        # Ajuste já terminado é guardado mesmo se cancelado no último instante
+        if fracao < 1.0 and id_tarefa in canceladas:
+            raise TarefaCancelada(id_tarefa)
+        progresso[id_tarefa] = fracao
+
+    # Direto no disco: o LRU de memória do processo de trabalho nunca seria consultado
+    ajuste = registro.obter_disco(chave, lambda: ajustar_serie(modelo, anos, y, _progresso))
+    # Só a previsão volta ao processo principal (estimadores como o Keras não são
+    # serializáveis), junto dos tempos de import e de ajuste medidos neste processo
+    return ajuste.sem_estimador(), tempos()
+
+
+# ---------------------------------------------------------------------------
+# Processo servidor
+# ---------------------------------------------------------------------------
+
+class _Execucao:
+    """Ajuste submetido ao pool do servidor"""
+
+    def __init__(self, chave, future):
+        self.chave = chave
+        self.future = future
+        self.interessados = 1
+        self.concluida_em = None
+
+    def estado(self):
+        if self.future.cancelled():
+            return 'cancelada'
+        if not self.future.done():
+            return 'executando' if self.future.running() else 'na fila'
+        erro = self.future.exception()
+        if erro is None:
+            return 'concluida'
+        return 'cancelada' if isinstance(erro, TarefaCancelada) else 'erro'
+
+
+def _erro_serializavel(erro):
+    # O erro volta à sessão pelo proxy; exceções que não se serializam viram RuntimeError
+    try:
+        pickle.dumps(erro)
+        return erro
+    except Exception:
+        return RuntimeError(str(erro))
+
+
+class ServicoTarefas:
+    """Pool de processos e tarefas do servidor; as sessões o acessam por um proxy"""
+
+    def __init__(self, max_processos=MAX_PROCESSOS):
+        # 'spawn': processos novos, que importam este módulo como principal
+        contexto = multiprocessing.get_context('spawn')
+        self._gerenciador = contexto.Manager()
+        # Compartilhados com os processos: id -> fração concluída / ids cancelados
+        self._progresso = self._gerenciador.dict()
+        self._canceladas = self._gerenciador.dict()
+        self._executor = ProcessPoolExecutor(max_workers=max_processos, mp_context=contexto)
+        self._lock = threading.Lock()
+        self._execucoes = {}
+        self._por_chave = {}
+
+    def _finalizar(self, id_tarefa):
+        with self._lock:
+            execucao = self._execucoes.get(id_tarefa)
+            if execucao is None:
+                return
+            execucao.concluida_em = time.time()
+            if self._por_chave.get(execucao.chave) == id_tarefa:
+                del self._por_chave[execucao.chave]
+        try:
+            self._progresso.pop(id_tarefa, None)
+            self._canceladas.pop(id_tarefa, None)
+        except (OSError, EOFError):
+            # Gerenciador já encerrado (saída do servidor)
+            pass
+
+    def _descartar_antigas(self):
+        limite = time.time() - RETENCAO_TAREFAS
+        for id_tarefa in [i for i, e in self._execucoes.items() if e.concluida_em and e.concluida_em < limite]:
+            del self._execucoes[id_tarefa]
+
+    def submeter(self, modelo, chave, anos, y):
+        """Id da tarefa que ajusta a série; reaproveita a tarefa em andamento com a mesma chave"""
+        with self._lock:
+            self._descartar_antigas()
+            id_existente = self._por_chave.get(chave)
+            if id_existente is not None and not self._execucoes[id_existente].future.done():
+                self._execucoes[id_existente].interessados += 1
+                return id_existente
+
+            id_tarefa = uuid.uuid4().hex
+            future = self._executor.submit(_executar, id_tarefa, modelo, chave, anos, y,
+                                           self._progresso, self._canceladas)
+            self._execucoes[id_tarefa] = _Execucao(chave, future)
+            self._por_chave[chave] = id_tarefa
+        future.add_done_callback(lambda _: self._finalizar(id_tarefa))
+        return id_tarefa
+
+    def situacao(self, ids):
+        """{id: (estado, fração concluída, erro)}; ids já descartados voltam como cancelados"""
+        with self._lock:
+            execucoes = {i: self._execucoes.get(i) for i in ids}
+        situacoes = {}
+        for id_tarefa, execucao in execucoes.items():
+            if execucao is None:
+                situacoes[id_tarefa] = ('cancelada', 1.0, None)
+                continue
+            estado = execucao.estado()
+            progresso = 1.0 if execucao.future.done() else self._progresso.get(id_tarefa, 0.0)
+            erro = _erro_serializavel(execucao.future.exception()) if estado == 'erro' else None
+            situacoes[id_tarefa] = (estado, progresso, erro)
+        return situacoes
+
+    def resultado(self, id_tarefa):
+        """(ajuste sem estimador, tempos do processo de trabalho) de uma tarefa concluída"""
+        with self._lock:
+            execucao = self._execucoes[id_tarefa]
+        return execucao.future.result()
+
+    def cancelar(self, id_tarefa):
+        """Retira o interesse de uma sessão; sem interessados, a tarefa é cancelada.
+
+        Tarefas na fila saem sem executar; as que estão em execução param no
+        próximo aviso de progresso (entre lotes de árvores ou épocas).
+        """
+        with self._lock:
+            execucao = self._execucoes.get(id_tarefa)
+            if execucao is None or execucao.future.done():
+                return
+            execucao.interessados -= 1
+            if execucao.interessados > 0:
+                return
+            if self._por_chave.get(execucao.chave) == id_tarefa:
+                del self._por_chave[execucao.chave]
+        # Fora do lock: `cancel` chama `_finalizar` imediatamente se a tarefa estava na fila
+        if not execucao.future.cancel():
+            self._canceladas[id_tarefa] = True
+
+    def estatisticas(self):
+        with self._lock:
+            estados = [e.estado() for e in self._execucoes.values()]
+        return {estado: estados.count(estado) for estado in set(estados)}
+
+    def encerrar(self):
+        """Cancela as tarefas em andamento e espera os processos de trabalho saírem"""
+        with self._lock:
+            em_andamento = [i for i, e in self._execucoes.items() if not e.future.done()]
+        for id_tarefa in em_andamento:
+            self._canceladas[id_tarefa] = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._gerenciador.shutdown()
+
+
+_servico_local = None
+
+
+def _obter_servico():
+    return _servico_local
+
+
+class GerenciadorTarefas(BaseManager):
+    """Conexão com o processo servidor"""
+
+
+GerenciadorTarefas.register('servico', callable=_obter_servico)
+
+
+def servir():
+    """Processo servidor: lê a chave de autenticação da entrada, publica a porta na
+    saída e atende até a entrada ser fechada (fim do processo que o iniciou)"""
+    global _servico_local
+    # Ctrl+C no terminal chega a todo o grupo; o servidor sai quando quem o iniciou sai
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    chave = bytes.fromhex(sys.stdin.readline().strip())
+    # A saída padrão (inclusive a dos processos criados daqui) passa a ser a de erros;
+    # a original só transmite a porta
+    saida = os.dup(sys.stdout.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    _servico_local = ServicoTarefas()
+    servidor = GerenciadorTarefas(address=('127.0.0.1', 0), authkey=chave).get_server()
+    os.write(saida, f'{servidor.address[1]}\n'.encode())
+    os.close(saida)
+
+    def _vigiar():
+        sys.stdin.read()
+        _servico_local.encerrar()
+        os._exit(0)
+
+    threading.Thread(target=_vigiar, daemon=True).start()
+    servidor.serve_forever()
+
+
+# ---------------------------------------------------------------------------
+# Lado das sessões
+# ---------------------------------------------------------------------------
+
+_lock = threading.Lock()
+_processo = None
+_servico = None
+
+
+def _conectar():
+    """Proxy do serviço, iniciando o processo servidor no primeiro uso (ou se ele caiu)"""
+    global _processo, _servico
+    with _lock:
+        if _processo is None or _processo.poll() is not None:
+            chave = os.urandom(32)
+            _processo = subprocess.Popen([sys.executable, '-m', 'utils.tarefas'], cwd=BASE_DIR,
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            # A entrada fica aberta enquanto este processo existir
+            _processo.stdin.write(chave.hex() + '\n')
+            _processo.stdin.flush()
+            porta = _processo.stdout.readline().strip()
+            if not porta:
+                raise RuntimeError("O processo de ajustes em segundo plano não iniciou")
+            gerenciador = GerenciadorTarefas(address=('127.0.0.1', int(porta)), authkey=chave)
+            gerenciador.connect()
+            _servico = gerenciador.servico()
+        return _servico
+
+
+class Tarefa:
+    """Ajuste submetido ao servidor; estado e progresso são os da última consulta de `acompanhar`"""
+
+    def __init__(self, id_tarefa, chave):
+        self.id = id_tarefa
+        self.chave = chave
+        self._situacao = ('na fila', 0.0, None)
+
+    def estado(self):
+        return self._situacao[0]
+
+    def progresso(self):
+        return self._situacao[1]
+
+    def erro(self):
+        return self._situacao[2]
+
+    def terminada(self):
+        return self.estado() in TERMINADAS
+
+
+def submeter(modelo, chave, anos, y):
+    """Submete o ajuste de uma série; reaproveita a tarefa em andamento com a mesma chave"""
+    return Tarefa(_conectar().submeter(modelo, chave, anos, y), chave)
+
+
+def cancelar(tarefa):
+    """Retira o interesse desta sessão na tarefa (ver `ServicoTarefas.cancelar`)"""
+    if not tarefa.terminada():
+        _conectar().cancelar(tarefa.id)
+
+
+def acompanhar(tarefas):
+    """Consulta as tarefas sem esperar. Retorna (todas terminadas, fração média concluída).
+
+    Os ajustes que terminaram desde a última consulta entram no registro em
+    memória deste processo.
+    """
+    pendentes = [t for t in tarefas if not t.terminada()]
+    if pendentes:
+        servico = _conectar()
+        situacoes = servico.situacao([t.id for t in pendentes])
+        for tarefa in pendentes:
+            tarefa._situacao = situacoes[tarefa.id]
+            if tarefa.estado() == 'concluida':
+                ajuste, tempos_processo = servico.resultado(tarefa.id)
+                registro.guardar(tarefa.chave, ajuste)
+                mesclar_tempos(tempos_processo)
+    fracao = sum(t.progresso() for t in tarefas) / len(tarefas) if tarefas else 1.0
+    return all(t.terminada() for t in tarefas), fracao
+
+
+def aguardar(tarefas, ao_progredir=None, intervalo=0.25):
+    """Espera as tarefas terminarem, chamando `ao_progredir(fracao_media)` a cada consulta.
+
+    Bloqueia a thread chamadora: é para a linha de comando (gerar_previsoes.py);
+    as páginas usam `acompanhar`.
+    """
+    while True:
+        terminadas, fracao = acompanhar(tarefas)
+        if ao_progredir:
+            ao_progredir(fracao)
+        if terminadas:
+            return
+        time.sleep(intervalo)
+
+
+def estatisticas_tarefas():
+    """Contagem de tarefas por estado ({} se o servidor ainda não foi iniciado)"""
+    if _processo is None or _processo.poll() is not None:
+        return {}
+    return _conectar().estatisticas()
+
+
+if __name__ == '__main__':
+    # Importa o módulo pelo nome: as classes servidas são as de utils.tarefas
+    from utils.tarefas import servir
+    servir()